@@ -0,0 +1,125 @@
+"""
+Measures how many irrelevant gateway events per second the server logging listeners can drop.
+
+Voice state and user updates arrive for every member in every guild, and almost all of them are
+never logged: mute/deafen toggles, guilds that don't log voice, users who share no logging guild
+with the bot. This drives ServerEventsCog's listeners directly with such events, next to a copy of
+the old "format first, check later" path, and reports events per second for each.
+
+The bot, guilds and members are lightweight stand-ins, so the numbers are the listener's own cost.
+Importing the cog needs the same .env as the bot.
+
+Usage:
+    python -m benchmarks.listener_prefilter [guilds] [seconds per case]
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+import discord
+
+from cogs.events import ServerEventsCog, get_ordinal
+from services.guild_config import LogEvent
+
+LOGGING_GUILDS = 5
+
+
+class _Guild:
+    def __init__(self, guild_id: int, member_ids: set[int]):
+        self.id = guild_id
+        self._members = member_ids
+
+    def get_member(self, user_id: int):
+        return user_id if user_id in self._members else None
+
+
+def _drive(coro):
+    # The reject path never awaits anything, so the coroutine finishes on its first step without an event loop.
+    try:
+        coro.send(None)
+    except StopIteration:
+        return
+    raise RuntimeError("listener awaited on what should be the reject path")
+
+
+def _legacy_voice_update(cog, member, before, after):
+    # The old listener: guild check, then timestamp and author formatting, then the channel comparison.
+    if member.bot or cog._log_channel_id_for(member.guild.id) is None:
+        return
+    timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
+    footer = f"ID: {member.id} | {timestamp}"
+    author_name = str(member)
+    author_icon = member.display_avatar.url
+    if before.channel is None and after.channel is not None:
+        pass
+    elif before.channel is not None and after.channel is None:
+        pass
+    elif before.channel is not None and after.channel is not None and before.channel.id != after.channel.id:
+        pass
+
+
+def _legacy_user_update(cog, guilds, before, after):
+    # The old listener: scan every guild for mutual membership, then format, then check what changed.
+    mutual_guilds = [guild for guild in guilds if guild.get_member(after.id) is not None]
+    channel_ids = {cog._log_channel_id_for(guild.id) for guild in mutual_guilds}
+    channel_ids.discard(None)
+    if not channel_ids:
+        return
+    timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
+    footer = f"ID: {after.id} | {timestamp}"
+    if before.name != after.name:
+        pass
+
+
+def _rate(fn, seconds: float) -> float:
+    # Runs batches of events until the time is up, so slow cases don't take forever.
+    events = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(1000):
+            fn()
+        events += 1000
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return events / elapsed
+
+
+def main(guild_count: int = 1000, seconds: float = 1.0):
+    guilds = [_Guild(guild_id, set(range(guild_id * 10, guild_id * 10 + 50))) for guild_id in range(1, guild_count + 1)]
+    guilds_by_id = {guild.id: guild for guild in guilds}
+    bot = SimpleNamespace(guilds=guilds, get_guild=guilds_by_id.get, get_channel=lambda channel_id: None)
+    cog = ServerEventsCog(bot)
+    cog.log_index.default_channel_id = None
+    # A handful of guilds log everything except voice, the rest log nothing.
+    cog.log_index.load({guild_id: (10**6 + guild_id, LogEvent.ALL & ~LogEvent.VOICE) for guild_id in range(1, LOGGING_GUILDS + 1)})
+
+    avatar = SimpleNamespace(url="https://cdn.discordapp.com/avatars/1/a.png")
+    member = SimpleNamespace(id=15, bot=False, guild=guilds[0], display_avatar=avatar)
+    general = SimpleNamespace(id=100, name="general")
+    gaming = SimpleNamespace(id=101, name="gaming")
+    muted_before = SimpleNamespace(channel=general)
+    muted_after = SimpleNamespace(channel=general)
+    switch_after = SimpleNamespace(channel=gaming)
+
+    # A member of a guild near the end of the list that doesn't log, changing only their display name.
+    user_id = guild_count * 10 + 1
+    user_before = SimpleNamespace(id=user_id, bot=False, name="someone", discriminator="0", avatar=None, display_avatar=avatar)
+    user_after = SimpleNamespace(id=user_id, bot=False, name="someone", discriminator="0", avatar=None, display_avatar=avatar)
+    renamed_after = SimpleNamespace(id=user_id, bot=False, name="someone_else", discriminator="0", avatar=None, display_avatar=avatar)
+
+    cases = [
+        ("voice: mute toggle (legacy, guild logs)", lambda: _legacy_voice_update(cog, member, muted_before, muted_after)),
+        ("voice: mute toggle", lambda: _drive(cog.on_voice_state_update(member, muted_before, muted_after))),
+        ("voice: switch, voice logging off", lambda: _drive(cog.on_voice_state_update(member, muted_before, switch_after))),
+        ("user: display name only", lambda: _drive(cog.on_user_update(user_before, user_after))),
+        ("user: rename, no logging guild (legacy)", lambda: _legacy_user_update(cog, guilds, user_before, renamed_after)),
+        ("user: rename, no logging guild", lambda: _drive(cog.on_user_update(user_before, renamed_after))),
+    ]
+
+    print(f"{guild_count:,} guilds, {LOGGING_GUILDS} logging")
+    for name, fn in cases:
+        print(f"{name:<44}{_rate(fn, seconds):>14,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
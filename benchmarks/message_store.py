@@ -0,0 +1,94 @@
+"""
+Compares the memory used by 100k messages in the compact message store against discord.py's message cache.
+
+The discord.py side builds real discord.Message objects from gateway payloads, the same way the
+library fills its cache, so the numbers are a fair per-message comparison. Real cached messages
+also reference guild, channel and member objects, so the discord.py figure is a lower bound.
+
+Usage:
+    python -m benchmarks.message_store [count]
+"""
+import sys
+import random
+import tracemalloc
+from datetime import datetime, timezone
+
+import discord
+from discord.state import ConnectionState
+
+from services.message_store import MessageStore, StoredMessage
+
+WORDS = "the quick brown fox jumps over a lazy dog while everyone in general chat argues about pineapple pizza lol".split()
+
+
+def _payloads(count: int) -> list[dict]:
+    rng = random.Random(42)
+    payloads = []
+    for i in range(count):
+        author_id = 10**17 + rng.randrange(2000)
+        attachments = []
+        if rng.random() < 0.1:
+            attachments.append({"id": str(10**18 + i), "filename": f"image_{i}.png", "size": rng.randrange(10**6), "url": f"https://cdn.discordapp.com/attachments/1/{i}/image_{i}.png", "proxy_url": f"https://media.discordapp.net/attachments/1/{i}/image_{i}.png"})
+        payloads.append({
+            "id": str(10**18 + i),
+            "channel_id": str(rng.randrange(1, 50)),
+            "type": 0,
+            "content": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 30))),
+            "author": {"id": str(author_id), "username": f"user{author_id % 2000}", "discriminator": "0", "avatar": "%032x" % author_id, "global_name": None},
+            "attachments": attachments,
+            "embeds": [],
+            "mentions": [],
+            "mention_roles": [],
+            "pinned": False,
+            "mention_everyone": False,
+            "tts": False,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "flags": 0,
+            "components": [],
+        })
+    return payloads
+
+
+def _measure(build) -> tuple[int, object]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, result
+
+
+def main(count: int = 100_000):
+    payloads = _payloads(count)
+    state = ConnectionState(dispatch=lambda *args: None, handlers={}, hooks={}, http=None, max_messages=None)
+    channel = discord.Object(id=1)
+
+    cache_bytes, messages = _measure(lambda: [discord.Message(state=state, channel=channel, data=data) for data in payloads])
+
+    def build_store():
+        store = MessageStore(max_bytes=10**12, max_channel_bytes=10**12)
+        for message in messages:
+            store.add(StoredMessage(
+                id=message.id,
+                channel_id=int(message.channel.id),
+                guild_id=None,
+                author_id=message.author.id,
+                author_name=str(message.author),
+                author_avatar_url=message.author.display_avatar.url,
+                content=message.content,
+                attachments=tuple((att.filename, att.size) for att in message.attachments),
+                created_at=message.created_at.timestamp(),
+            ))
+        return store
+
+    store_bytes, store = _measure(build_store)
+
+    print(f"{count:,} messages")
+    print(f"{'discord.py message cache':<28}{cache_bytes / 2**20:>10.1f} MB{cache_bytes / count:>10.0f} B/msg")
+    print(f"{'compact message store':<28}{store_bytes / 2**20:>10.1f} MB{store_bytes / count:>10.0f} B/msg")
+    print(f"{'store estimate (size caps)':<28}{store.total_bytes / 2**20:>10.1f} MB{store.total_bytes / count:>10.0f} B/msg")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,69 @@
+"""
+Benchmarks welcome image encoding settings against the bundled backgrounds.
+
+Renders a sample welcome image on every background in res/welcomeMessages/ with each encoding and
+reports the median encode time and the average upload size, so WELCOME_IMAGE_FORMAT,
+WELCOME_IMAGE_QUALITY and WELCOME_IMAGE_WIDTH can be picked with numbers instead of guesses.
+
+Usage:
+    python -m benchmarks.welcome_encoding [repeats]
+"""
+import io
+import sys
+import statistics
+
+from PIL import Image, ImageDraw
+
+from services.image_encoding import ImageEncoding
+from services.template_cache import scan_templates
+from services.welcome_service import BACKGROUND_DIR, render_welcome_image
+
+ENCODINGS = [
+    ImageEncoding('png'),
+    ImageEncoding('png', quality=1),
+    ImageEncoding('png', quality=9),
+    ImageEncoding('png', width=1280),
+    ImageEncoding('webp', quality=80),
+    ImageEncoding('webp', quality=90),
+    ImageEncoding('webp', quality=80, width=1280),
+    ImageEncoding('jpeg', quality=85),
+    ImageEncoding('jpeg', quality=90),
+    ImageEncoding('jpeg', quality=85, width=1280),
+    ImageEncoding('jpeg', quality=85, width=960),
+]
+
+
+def _sample_avatar() -> bytes:
+    # A gradient with some detail, so it compresses roughly like a real avatar rather than a flat color.
+    image = Image.linear_gradient('L').resize((512, 512)).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for i in range(0, 512, 32):
+        draw.line((0, i, 512, 512 - i), fill=(255, 120, 40), width=6)
+    buffer = io.BytesIO()
+    image.save(buffer, 'png')
+    return buffer.getvalue()
+
+
+def main(repeats: int = 3):
+    signature = scan_templates(BACKGROUND_DIR)
+    backgrounds = [name for name, _, _ in signature]
+    if not backgrounds:
+        print(f"No backgrounds found in {BACKGROUND_DIR}")
+        return
+    avatar = _sample_avatar()
+
+    print(f"{len(backgrounds)} background(s), {repeats} repeat(s) each\n")
+    print(f"{'encoding':<24}{'encode ms (median)':>20}{'size KB (avg)':>16}")
+    for encoding in ENCODINGS:
+        times = []
+        sizes = []
+        for bg_name in backgrounds:
+            for _ in range(repeats):
+                (image_bytes, _), timings = render_welcome_image(avatar, False, "Benchmark User", "Benchmark Server", bg_name, signature, encoding)
+                times.append(timings['encode'] * 1000)
+                sizes.append(len(image_bytes) / 1024)
+        print(f"{str(encoding):<24}{statistics.median(times):>20.1f}{statistics.mean(sizes):>16.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -5,7 +5,9 @@ from dotenv import load_dotenv
 import os
 import asyncio
 import logging
-from services.send_metrics import send_metrics
+from services.http_client import close_sessions
+from services.send_event import start_event_queue, stop_event_queue
+from services.command_timing import InstrumentedCommandTree
 
 # Set logging directories & files. Ensure they exist, if they don't exist, create them. Set the configuration for logging.
 log_directory = "logs"
@@ -72,7 +74,12 @@ intents.voice_states = True
 
 logger.info("Initializing commands.Bot instance...")
 
-bot = commands.Bot(command_prefix="!", intents=intents) 
+# discord.py's own message cache holds full Message objects. Server logging keeps its own compact store
+# (see services/message_store.py), so the cache is off unless DISCORD_MAX_MESSAGES asks for one.
+DISCORD_MAX_MESSAGES = int(os.getenv('DISCORD_MAX_MESSAGES', 0)) or None
+
+# The instrumented tree times every slash command for /stats and the Prometheus endpoint.
+bot = commands.Bot(command_prefix="!", intents=intents, max_messages=DISCORD_MAX_MESSAGES, tree_cls=InstrumentedCommandTree) 
 
 # Load all cogs which are used for bot functionality.
 async def load_cogs():
@@ -125,15 +132,7 @@ async def on_ready():
     logger.info("Bot is ready and online.")
     logger.info("-" * 30)
 
-    total_guilds = len(bot.guilds)
-    total_members = sum(g.member_count for g in bot.guilds if g.member_count)
-
-    send_metrics({
-        "total_servers": total_guilds,
-        "total_members": total_members
-    })
-
-    logger.info("Sent metrics to SlowStats.")
+    # Metrics are no longer sent from here, on_ready fires on every reconnect. See cogs/metrics.py.
 
     # Sync commands to discord, very very important :) 
     logger.info("Attempting to sync application (slash) commands globally...")
@@ -159,9 +158,18 @@ async def on_ready():
 async def main():
     async with bot:
         await load_cogs() 
+        start_event_queue()
         
         logger.info("Attempting to connect to Discord...")
-        await bot.start(DISCORD_BOT_TOKEN)
+        try:
+            await bot.start(DISCORD_BOT_TOKEN)
+        finally:
+            # Close the bot first: unloading cogs can still fetch avatars and queue events, e.g. flushing a join burst.
+            await bot.close()
+            # Flush any queued SlowStats events before the HTTP sessions go away.
+            await stop_event_queue()
+            # Close the pooled upstream HTTP sessions so aiohttp doesn't complain about unclosed connectors.
+            await close_sessions()
 
 # This part is purely AI because although we aren't vibe coders, we definitely didn't wanna spend the time learning asyncio.  
 if __name__ == "__main__":
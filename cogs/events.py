@@ -2,9 +2,20 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import datetime
+import io
 import os
+import time
+import asyncio
 import logging
 from services.send_event import send_event
+from services.join_burst import JoinBurstDetector
+from services.embed_batcher import EmbedBatcher
+from services.guild_config import GuildConfigStore, LogEvent
+from services.log_index import LogIndex
+from services.message_store import MessageStore, StoredMessage
+from services.text_diff import inline_diff
+from services.voice_sessions import VoiceSession, VoiceSessionTracker
+from services.command_timing import stage
 
 #We need ordinals for logging, because "May 1st" is better than "May 1".
 def get_ordinal(n):
@@ -20,93 +31,251 @@ def get_ordinal(n):
     else:
         return str(n) + "th"
 
+# Names shown for each kind of loggable event in /log_events.
+LOG_EVENT_LABELS = {
+    LogEvent.MESSAGE_EDITS: "Message edits",
+    LogEvent.MESSAGE_DELETES: "Message deletes",
+    LogEvent.VOICE: "Voice sessions",
+    LogEvent.JOINS: "Member joins",
+    LogEvent.LEAVES: "Member leaves",
+    LogEvent.USER_UPDATES: "Name and avatar changes",
+}
+
+# Voice sessions read better as "1h 5m" than as a number of seconds.
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
 # Oh my god, it's time for welcome images! But this part just tries to import the generate image function.
 try:
-    from services.welcome_service import generate_image 
+    from services.welcome_service import generate_image, generate_group_image, reload_templates, shutdown_render_pool 
     WELCOME_SERVICE_AVAILABLE = True
 except ImportError:
     logging.warning("Could not import 'generate_image' from 'services.welcome_service'. Welcome image on join and /test_welcome will be disabled.")
     WELCOME_SERVICE_AVAILABLE = False
     async def generate_image(*args, **kwargs): return None 
+    async def generate_group_image(*args, **kwargs): return None 
+    async def reload_templates(): return []
+    def shutdown_render_pool(): pass
 
 #Define the logger 
 logger = logging.getLogger(__name__)
 
+# Join burst settings. More than JOIN_BURST_THRESHOLD joins within JOIN_BURST_WINDOW seconds switches a guild to one coalesced welcome per batch.
+JOIN_BURST_THRESHOLD = int(os.getenv('JOIN_BURST_THRESHOLD', 5))
+JOIN_BURST_WINDOW = float(os.getenv('JOIN_BURST_WINDOW', 30))
+JOIN_BURST_FLUSH_DELAY = float(os.getenv('JOIN_BURST_FLUSH_DELAY', 10))
+JOIN_BURST_COMPOSITE = os.getenv('JOIN_BURST_COMPOSITE', 'true').lower() in ('1', 'true', 'yes')
+
+# Log embeds are buffered per log channel and sent up to 10 per message.
+LOG_BATCH_INTERVAL = float(os.getenv('LOG_BATCH_INTERVAL', 2))
+
+# Per-guild log channels are stored here. A log channel that can't be fetched is retried after LOG_CHANNEL_RETRY_SECONDS.
+COMMANDER_DB_PATH = os.getenv('COMMANDER_DB_PATH', os.path.join('data', 'commander.db'))
+LOG_CHANNEL_RETRY_SECONDS = float(os.getenv('LOG_CHANNEL_RETRY_SECONDS', 300))
+
+# Size caps of the store that backs edit/delete logging, in place of discord.py's message cache.
+MESSAGE_STORE_MB = float(os.getenv('MESSAGE_STORE_MB', 64))
+MESSAGE_STORE_CHANNEL_MB = float(os.getenv('MESSAGE_STORE_CHANNEL_MB', 4))
+# Edits to the same message within this many seconds of the first one are folded into a single log entry. 0 logs every edit right away.
+EDIT_DEBOUNCE_SECONDS = float(os.getenv('EDIT_DEBOUNCE_SECONDS', 15))
+# A member who leaves voice and comes back within this many seconds stays in the same voice session.
+VOICE_RECONNECT_GRACE = float(os.getenv('VOICE_RECONNECT_GRACE', 30))
+
 #This is for SERVER logging, not PROGRAM LOGGING. don't mix those two up. This logs SERVER EVENTS in the server
 class ServerEventsCog(commands.Cog, name="Server Logging"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.log_channel_id = None
-        self.log_channel = None
-
-        # Get the log channel ID. If it doesn't work, continue like nothing happened.
+        # Where each guild logs and which events it logs, loaded from the guild config store. Listeners check here before doing any work.
+        self.log_index = LogIndex()
+        self.config_store = GuildConfigStore(COMMANDER_DB_PATH)
+        self._channel_retry_at: dict[int, float] = {}
+        self.join_bursts = JoinBurstDetector(JOIN_BURST_THRESHOLD, JOIN_BURST_WINDOW)
+        self._pending_joins: dict[int, list[discord.Member]] = {}
+        self._join_flush_tasks: dict[int, asyncio.Task] = {}
+        self.log_batcher = EmbedBatcher(LOG_BATCH_INTERVAL)
+        self.message_store = MessageStore(int(MESSAGE_STORE_MB * 1024 * 1024), int(MESSAGE_STORE_CHANNEL_MB * 1024 * 1024))
+        self._pending_edits: dict[int, dict] = {}
+        self._edit_flush_tasks: dict[int, asyncio.Task] = {}
+        self.voice_sessions = VoiceSessionTracker(VOICE_RECONNECT_GRACE)
+        self._voice_flush_tasks: dict[tuple[int, int], asyncio.Task] = {}
+
+        # Get the fallback log channel ID, used by guilds that haven't set their own. If it doesn't work, continue like nothing happened.
         log_id_str = os.getenv('LOG_CHANNEL_ID')
         if log_id_str:
             try:
-                self.log_channel_id = int(log_id_str)
-                logger.info(f"ServerEventsCog initialized. Log Channel ID set to: {self.log_channel_id}")
+                self.log_index.default_channel_id = int(log_id_str)
+                logger.info(f"ServerEventsCog initialized. Default Log Channel ID set to: {self.log_index.default_channel_id}")
             except ValueError:
-                logger.error(f"Invalid LOG_CHANNEL_ID found in .env: '{log_id_str}'. Must be an integer. Server event logging disabled.")
-                self.log_channel_id = None
+                logger.error(f"Invalid LOG_CHANNEL_ID found in .env: '{log_id_str}'. Must be an integer. Only per-guild log channels will be used.")
         else:
-            logger.warning("LOG_CHANNEL_ID not found in .env file. Server event logging to Discord channel is disabled.")
+            logger.info("LOG_CHANNEL_ID not found in .env file. Only per-guild log channels (/set_log_channel) will be used.")
 
-    #Gets the log channel based on the channel ID, then returns the discord text channel object. 
-    async def _get_log_channel(self) -> discord.TextChannel | None:
-        if not self.log_channel_id:
-             return None
+    # Load the per-guild log channels and start the welcome image workers up front, so the backgrounds are decoded before the first join.
+    async def cog_load(self):
+        try:
+            self.log_index.load(await asyncio.to_thread(self.config_store.load_log_channels))
+            logger.info(f"Loaded {len(self.log_index)} per-guild log channel(s) from {COMMANDER_DB_PATH}.")
+        except Exception as e:
+            logger.error(f"Failed to load per-guild log channels from {COMMANDER_DB_PATH}: {e}", exc_info=True)
 
-        if self.log_channel and isinstance(self.log_channel, discord.TextChannel) and self.log_channel.id == self.log_channel_id:
-            return self.log_channel
+        if WELCOME_SERVICE_AVAILABLE:
+            backgrounds = await reload_templates()
+            logger.info(f"Welcome image backgrounds: {backgrounds}")
+
+    # Send any coalesced welcomes, edits and voice sessions that are still waiting, then stop the welcome image workers.
+    async def cog_unload(self):
+        for task in self._join_flush_tasks.values():
+            task.cancel()
+        self._join_flush_tasks.clear()
+        for guild_id in list(self._pending_joins):
+            await self._send_burst_joins(guild_id)
+        for task in self._edit_flush_tasks.values():
+            task.cancel()
+        self._edit_flush_tasks.clear()
+        for message_id in list(self._pending_edits):
+            await self._send_edit_log(message_id)
+        for task in self._voice_flush_tasks.values():
+            task.cancel()
+        self._voice_flush_tasks.clear()
+        for session, still_connected in self.voice_sessions.close_all():
+            await self._send_voice_session_log(session, still_connected)
+        await self.log_batcher.flush_all()
+        shutdown_render_pool()
+
+    # Returns the log channel ID for a guild, or None if the guild doesn't log that event (or anything, with no event given).
+    def _log_channel_id_for(self, guild_id: int | None, event: LogEvent = None) -> int | None:
+        return self.log_index.channel_for(guild_id, event)
+
+    #Gets the log channel from the gateway cache, and only falls back to the API on a miss. 
+    async def _get_log_channel(self, channel_id: int) -> discord.TextChannel | None:
+        channel = self.bot.get_channel(channel_id)
+        if isinstance(channel, discord.TextChannel):
+            return channel
+
+        # Don't hammer the API for a channel that just failed, try again after a while instead of giving up forever.
+        retry_at = self._channel_retry_at.get(channel_id)
+        if retry_at and time.monotonic() < retry_at:
+            return None
 
-        logger.debug(f"Attempting to fetch log channel with ID: {self.log_channel_id}")
+        logger.debug(f"Log channel {channel_id} not in cache, attempting to fetch it.")
         try:
-            channel = await self.bot.fetch_channel(self.log_channel_id)
+            channel = await self.bot.fetch_channel(channel_id)
             if isinstance(channel, discord.TextChannel):
-                self.log_channel = channel # Cache the fetched channel
+                self._channel_retry_at.pop(channel_id, None)
                 logger.info(f"Successfully fetched log channel: {channel.name} (ID: {channel.id})")
-                return self.log_channel
+                return channel
             else:
-                logger.warning(f"Fetched channel for ID {self.log_channel_id} is not a TextChannel (Type: {type(channel)}). Logging disabled.")
-                self.log_channel_id = None # Disable if wrong type
-                return None
+                logger.warning(f"Fetched channel for ID {channel_id} is not a TextChannel (Type: {type(channel)}). Skipping logs for it.")
         except discord.NotFound:
-            logger.error(f"Log channel with ID {self.log_channel_id} not found by the bot.")
-            self.log_channel_id = None # Disable if not found
-            return None
+            logger.error(f"Log channel with ID {channel_id} not found by the bot.")
         except discord.Forbidden:
-            logger.error(f"Bot lacks permissions to fetch log channel ID {self.log_channel_id}.")
-            self.log_channel_id = None # Disable if forbidden
-            return None
+            logger.error(f"Bot lacks permissions to fetch log channel ID {channel_id}.")
         except Exception as e:
-            logger.error(f"An unexpected error occurred fetching log channel ID {self.log_channel_id}: {e}", exc_info=True)
-            return None
+            logger.error(f"An unexpected error occurred fetching log channel ID {channel_id}: {e}", exc_info=True)
+        self._channel_retry_at[channel_id] = time.monotonic() + LOG_CHANNEL_RETRY_SECONDS
+        return None
             
-    # Sends the log embed to the log channel 
-    async def _send_log_embed(self, embed: discord.Embed):
-        log_channel = await self._get_log_channel()
+    # Queues the log embed for the guild's log channel. It goes out with up to 9 others in the next batch.
+    async def _send_log_embed(self, embed: discord.Embed, guild_id: int):
+        channel_id = self._log_channel_id_for(guild_id)
+        if channel_id is not None:
+            await self._send_log_embed_to(embed, channel_id)
+
+    # Sends a log embed with an attachment. It can't be batched, but still goes out after anything queued before it.
+    async def _send_log_file(self, embed: discord.Embed, file: discord.File, guild_id: int):
+        channel_id = self._log_channel_id_for(guild_id)
+        if channel_id is None:
+            return
+        log_channel = await self._get_log_channel(channel_id)
         if log_channel:
-            try:
-                await log_channel.send(embed=embed)
-            except discord.Forbidden:
-                logger.error(f"Bot lacks permissions to send messages in log channel: {log_channel.name} (ID: {log_channel.id})")
-            except discord.HTTPException as e:
-                logger.error(f"Failed to send log message to {log_channel.name}: {e}", exc_info=True)
-            except Exception as e:
-                 logger.error(f"An unexpected error occurred sending log to {log_channel.name}: {e}", exc_info=True)
+            await self.log_batcher.send_with_file(log_channel, embed, file)
+
+    async def _send_log_embed_to(self, embed: discord.Embed, channel_id: int):
+        log_channel = await self._get_log_channel(channel_id)
+        if log_channel:
+            self.log_batcher.add(log_channel, embed)
+
+    # Lets server managers pick where their server's events get logged.
+    @app_commands.command(name="set_log_channel", description="Log this server's events (edits, deletes, joins, voice) to a channel.")
+    @app_commands.describe(channel="The channel server events should be logged to.")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def set_log_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
+        logger.info(f"/set_log_channel used by {interaction.user} (ID: {interaction.user.id}) in '{interaction.guild.name}' for #{channel.name}")
+        if not channel.permissions_for(interaction.guild.me).send_messages:
+            await interaction.response.send_message(f"I can't send messages in {channel.mention}. Please check my permissions and try again.", ephemeral=True)
+            return
+        try:
+            await asyncio.to_thread(self.config_store.set_log_channel, interaction.guild_id, channel.id)
+        except Exception as e:
+            logger.error(f"Failed to save log channel for guild {interaction.guild_id}: {e}", exc_info=True)
+            await interaction.response.send_message("Sorry, I couldn't save that setting. Please try again later.", ephemeral=True)
+            return
+        route = self.log_index.route(interaction.guild_id)
+        self.log_index.set_route(interaction.guild_id, channel.id, route[1] if route else LogEvent.ALL)
+        self._channel_retry_at.pop(channel.id, None)
+        await interaction.response.send_message(f"Server events will now be logged to {channel.mention}.", ephemeral=True)
+
+    @app_commands.command(name="clear_log_channel", description="Stop logging this server's events.")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def clear_log_channel(self, interaction: discord.Interaction):
+        logger.info(f"/clear_log_channel used by {interaction.user} (ID: {interaction.user.id}) in '{interaction.guild.name}'")
+        try:
+            await asyncio.to_thread(self.config_store.clear_log_channel, interaction.guild_id)
+        except Exception as e:
+            logger.error(f"Failed to clear log channel for guild {interaction.guild_id}: {e}", exc_info=True)
+            await interaction.response.send_message("Sorry, I couldn't save that setting. Please try again later.", ephemeral=True)
+            return
+        self.log_index.remove_route(interaction.guild_id)
+        if self.log_index.default_channel_id:
+            await interaction.response.send_message("This server's log channel was cleared. Events will go to the bot's default log channel.", ephemeral=True)
+        else:
+            await interaction.response.send_message("This server's events will no longer be logged.", ephemeral=True)
+
+    @app_commands.command(name="log_events", description="Turn logging of one kind of server event on or off.")
+    @app_commands.describe(event="The kind of event.", enabled="Whether to log it.")
+    @app_commands.choices(event=[app_commands.Choice(name=label, value=int(flag)) for flag, label in LOG_EVENT_LABELS.items()])
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def log_events(self, interaction: discord.Interaction, event: app_commands.Choice[int], enabled: bool):
+        logger.info(f"/log_events used by {interaction.user} (ID: {interaction.user.id}) in '{interaction.guild.name}': {event.name} -> {enabled}")
+        route = self.log_index.route(interaction.guild_id)
+        if route is None:
+            await interaction.response.send_message("This server doesn't have its own log channel yet. Set one with `/set_log_channel` first.", ephemeral=True)
+            return
+        channel_id, events = route
+        events = events | LogEvent(event.value) if enabled else events & ~LogEvent(event.value)
+        try:
+            await asyncio.to_thread(self.config_store.set_log_events, interaction.guild_id, events)
+        except Exception as e:
+            logger.error(f"Failed to save log events for guild {interaction.guild_id}: {e}", exc_info=True)
+            await interaction.response.send_message("Sorry, I couldn't save that setting. Please try again later.", ephemeral=True)
+            return
+        self.log_index.set_route(interaction.guild_id, channel_id, events)
+        logged = ", ".join(label for flag, label in LOG_EVENT_LABELS.items() if events & flag) or "nothing"
+        await interaction.response.send_message(f"{event.name} will {'now' if enabled else 'no longer'} be logged. This server logs: {logged}.", ephemeral=True)
 
     # This is for testing, but is a permanent command. Users can use this to preview their welcome image!
     @app_commands.command(name="test_welcome", description="Generates a test welcome image using your info.")
     async def test_welcome(self, interaction: discord.Interaction):
         logger.info(f"/test_welcome command triggered by {interaction.user} (ID: {interaction.user.id}) in server '{interaction.guild.name}'")
-        await interaction.response.defer(ephemeral=True)
+        with stage('defer'):
+            await interaction.response.defer(ephemeral=True)
 
         if not WELCOME_SERVICE_AVAILABLE:
             logger.error("Welcome service is not available (failed import). Cannot run /test_welcome.")
             await interaction.followup.send("Sorry, the welcome image generator is currently unavailable.", ephemeral=True)
             return
 
-        member_avatar_url = interaction.user.display_avatar.url
+        member_avatar = interaction.user.display_avatar
         member_name = interaction.user.display_name
         server_name = interaction.guild.name
 
@@ -126,86 +295,137 @@ class ServerEventsCog(commands.Cog, name="Server Logging"):
         )
 
         try:
-            welcome_file = await generate_image(member_avatar_url, member_name, server_name)
+            with stage('build'):
+                welcome_file = await generate_image(member_avatar, member_name, server_name)
         except Exception as e:
             logger.error(f"An unexpected error occurred calling generate_image for test: {e}", exc_info=True)
             welcome_file = None
 
         if welcome_file:
             logger.info(f"Successfully generated test welcome image for {interaction.user.name}.")
-            await interaction.followup.send("Here is your test welcome image:", file=welcome_file, ephemeral=True)
+            with stage('send'):
+                await interaction.followup.send("Here is your test welcome image:", file=welcome_file, ephemeral=True)
         else:
             logger.error(f"generate_image returned None for test command user {interaction.user.name}.")
             await interaction.followup.send("Sorry, I couldn't generate the test welcome image. Please check the bot logs for errors.", ephemeral=True)
 
 
+    # Remembers messages from guilds that log, so edits and deletes can be described without discord.py's message cache.
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or not message.guild or self._log_channel_id_for(message.guild.id, LogEvent.MESSAGE_EDITS | LogEvent.MESSAGE_DELETES) is None:
+            return
+        self.message_store.add(StoredMessage.from_message(message))
+
+    # Returns the channel name for a stored message, without hitting the API.
+    def _channel_name(self, channel_id: int) -> str:
+        channel = self.bot.get_channel(channel_id)
+        return channel.name if channel else str(channel_id)
+
     # This listens for messages which are edits.
     @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
-        # Ignore edits if they're not from users.
-        if before.author.bot or before.content == after.content or not self.log_channel_id:
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        # Embed-only updates (e.g. link previews) don't carry content.
+        if 'content' not in payload.data or not payload.guild_id or self._log_channel_id_for(payload.guild_id, LogEvent.MESSAGE_EDITS) is None:
+            return
+
+        record = self.message_store.get(payload.message_id)
+        # Ignore edits to messages we never saw (bots, before startup, or evicted) and edits that didn't change the text.
+        if record is None:
+            logger.debug(f"Ignoring edit of message {payload.message_id}, it is not in the message store.")
+            return
+        before_content = record.content
+        after_content = payload.data['content']
+        if before_content == after_content:
+            return
+        self.message_store.update_content(payload.message_id, after_content)
+
+        # Fold a burst of edits to the same message into one log entry, showing the first and final versions.
+        pending = self._pending_edits.get(payload.message_id)
+        if pending:
+            pending['edits'] += 1
+            return
+        self._pending_edits[payload.message_id] = {'record': record, 'guild_id': payload.guild_id, 'before': before_content, 'edits': 1}
+        if EDIT_DEBOUNCE_SECONDS > 0:
+            self._edit_flush_tasks[payload.message_id] = asyncio.create_task(self._flush_edit_later(payload.message_id), name=f"edit-debounce-{payload.message_id}")
+        else:
+            await self._send_edit_log(payload.message_id)
+
+    async def _flush_edit_later(self, message_id: int):
+        try:
+            await asyncio.sleep(EDIT_DEBOUNCE_SECONDS)
+        finally:
+            if self._edit_flush_tasks.get(message_id) is asyncio.current_task():
+                del self._edit_flush_tasks[message_id]
+        await self._send_edit_log(message_id)
+
+    # Sends a pending edit right away, e.g. before logging the message's deletion so the two stay in order.
+    async def _flush_pending_edit(self, message_id: int):
+        task = self._edit_flush_tasks.pop(message_id, None)
+        if task:
+            task.cancel()
+        await self._send_edit_log(message_id)
+
+    async def _send_edit_log(self, message_id: int):
+        pending = self._pending_edits.pop(message_id, None)
+        if pending is None:
+            return
+        # The record may have been evicted or deleted since, but it still holds the latest content.
+        record = pending['record']
+        edits = pending['edits']
+        if record.content == pending['before']:
+            logger.debug(f"Skipping edit log for message {message_id}, it was edited back to its original content.")
             return
-        
-        # Redundancy to ensure that the message objects are complete
-        if not before.guild or not after.guild or not after.channel:
-             logger.debug("Ignoring message edit event with incomplete data (likely cache).")
-             return
 
         timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
-        footer = f"User ID: {after.author.id} | Msg ID: {after.id} | {timestamp}"
-        
-        before_content = before.content[:1020] + "..." if len(before.content) > 1024 else before.content
-        after_content = after.content[:1020] + "..." if len(after.content) > 1024 else after.content
+        footer = f"User ID: {record.author_id} | Msg ID: {record.id} | {timestamp}"
+        changes = inline_diff(pending['before'], record.content, limit=1000)
 
+        channel_name = self._channel_name(record.channel_id)
+        jump_url = f"https://discord.com/channels/{pending['guild_id']}/{record.channel_id}/{record.id}"
         embed = discord.Embed(
-            title=f"Message Edited in #{after.channel.name}", 
-            description=f"[Jump to Message]({after.jump_url})",
+            title=f"Message Edited in #{channel_name}" + (f" ({edits} edits)" if edits > 1 else ""),
+            description=f"[Jump to Message]({jump_url})",
             color=discord.Color.orange()
         )
-        author_name = str(after.author)
-        author_icon = after.author.display_avatar.url
-        embed.set_author(name=author_name, icon_url=author_icon)
-        embed.add_field(name="Before:", value=f"```{before_content}```" if before_content else "`[Empty Message]`", inline=False)
-        embed.add_field(name="After:", value=f"```{after_content}```" if after_content else "`[Empty Message]`", inline=False)
+        embed.set_author(name=record.author_name, icon_url=record.author_avatar_url)
+        embed.add_field(name="Changes:", value=f"```{changes}```", inline=False)
         embed.set_footer(text=footer)
-        
-        await self._send_log_embed(embed)
-        logger.debug(f"Logged message edit by {author_name} in #{after.channel.name}")
+
+        await self._send_log_embed(embed, pending['guild_id'])
+        logger.debug(f"Logged {edits} edit(s) by {record.author_name} in #{channel_name}")
 
 
     # This listens for messages which are deleted.
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
-        # Ignore messages which are sent from the bot, or are embeds.
-        if message.author.bot or not self.log_channel_id or message.content is None:
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.message_id in self._pending_edits:
+            await self._flush_pending_edit(payload.message_id)
+        record = self.message_store.pop(payload.message_id)
+        # Messages we never stored (bots, before startup, or evicted) can't be described, so skip them.
+        if record is None or not payload.guild_id or self._log_channel_id_for(payload.guild_id, LogEvent.MESSAGE_DELETES) is None:
             return
-            
-        # Checks to ensure message is complete.
-        if not message.guild or not message.channel:
-             logger.debug("Ignoring message delete event with incomplete data (likely cache).")
-             return
 
         timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
-        footer = f"Author ID: {message.author.id} | Msg ID: {message.id} | {timestamp}"
+        footer = f"Author ID: {record.author_id} | Msg ID: {record.id} | {timestamp}"
         
-        deleted_content = message.content[:1020] + "..." if len(message.content) > 1024 else message.content
+        deleted_content = record.content[:1020] + "..." if len(record.content) > 1024 else record.content
 
+        channel_name = self._channel_name(payload.channel_id)
         embed = discord.Embed(
-            title=f"Message Deleted in #{message.channel.name}", 
+            title=f"Message Deleted in #{channel_name}", 
             color=discord.Color.red()
         )
-        author_name = str(message.author)
-        author_icon = message.author.display_avatar.url
-        embed.set_author(name=author_name, icon_url=author_icon)
+        embed.set_author(name=record.author_name, icon_url=record.author_avatar_url)
         if deleted_content:
              embed.add_field(name="Deleted Message:", value=f"```{deleted_content}```", inline=False)
         else:
              embed.add_field(name="Deleted Message:", value="`[Empty or Embed Message]`", inline=False)
 
-        if message.attachments:
+        if record.attachments:
             files_str = ""
-            for att in message.attachments:
-                line = f"- {att.filename} ({att.size // 1024} KB)\n"
+            for filename, size in record.attachments:
+                line = f"- {filename} ({size // 1024} KB)\n"
                 if len(files_str) + len(line) > 1020: 
                      files_str += "..."
                      break
@@ -214,50 +434,138 @@ class ServerEventsCog(commands.Cog, name="Server Logging"):
 
         embed.set_footer(text=footer)
         
-        await self._send_log_embed(embed)
-        logger.debug(f"Logged message delete by {author_name} in #{message.channel.name}")
+        await self._send_log_embed(embed, payload.guild_id)
+        logger.debug(f"Logged message delete by {record.author_name} in #{channel_name}")
 
 
-    # This listens for voice channel changes.
+    # This listens for purges. One summary embed plus a text file of every deleted message, instead of one embed per message.
+    # Discord sends bulk deletes as their own event, and their records are popped from the store here, so the
+    # per-message delete path never sees them.
     @commands.Cog.listener()
-    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
-        if member.bot or not self.log_channel_id:
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids & self._pending_edits.keys():
+            await self._flush_pending_edit(message_id)
+        records = [record for record in map(self.message_store.pop, payload.message_ids) if record is not None]
+        if not payload.guild_id or self._log_channel_id_for(payload.guild_id, LogEvent.MESSAGE_DELETES) is None:
             return
+        records.sort(key=lambda record: record.id)
 
         timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
-        footer = f"ID: {member.id} | {timestamp}"
+        channel_name = self._channel_name(payload.channel_id)
+        deleted_count = len(payload.message_ids)
+
+        embed = discord.Embed(
+            title=f"{deleted_count} Messages Bulk Deleted in #{channel_name}",
+            color=discord.Color.dark_red()
+        )
+        if records:
+            # Top authors, so the summary says whose messages went without opening the file.
+            author_counts = {}
+            for record in records:
+                author_counts[record.author_name] = author_counts.get(record.author_name, 0) + 1
+            top_authors = sorted(author_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+            authors_str = "\n".join(f"- {name}: {count}" for name, count in top_authors)
+            if len(author_counts) > len(top_authors):
+                authors_str += f"\n...and {len(author_counts) - len(top_authors)} more"
+            embed.add_field(name="Authors:", value=authors_str[:1024], inline=False)
+        embed.add_field(name="Content Recovered:", value=f"{len(records)} of {deleted_count} messages", inline=False)
+        embed.set_footer(text=f"Channel ID: {payload.channel_id} | {timestamp}")
+
+        if not records:
+            await self._send_log_embed(embed, payload.guild_id)
+            logger.debug(f"Logged bulk delete of {deleted_count} uncached message(s) in #{channel_name}")
+            return
+
+        lines = []
+        for record in records:
+            created = datetime.datetime.fromtimestamp(record.created_at, tz=datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+            lines.append(f"[{created}] {record.author_name} ({record.author_id}) | Msg ID: {record.id}")
+            lines.append(record.content if record.content else "[Empty or Embed Message]")
+            for filename, size in record.attachments:
+                lines.append(f"  Attachment: {filename} ({size // 1024} KB)")
+            lines.append("")
+        log_file = discord.File(fp=io.BytesIO("\n".join(lines).encode('utf-8')), filename=f"bulk_delete_{payload.channel_id}.txt")
+
+        await self._send_log_file(embed, log_file, payload.guild_id)
+        logger.debug(f"Logged bulk delete of {deleted_count} message(s) in #{channel_name}")
+
+
+    # This listens for voice channel changes. Joins, switches and leaves are folded into one session per member,
+    # which is logged once the member has been gone for VOICE_RECONNECT_GRACE seconds.
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+        # Mute, deafen, stream and video toggles keep the member in the same channel and are the bulk of these events.
+        if before.channel == after.channel or member.bot or self._log_channel_id_for(member.guild.id, LogEvent.VOICE) is None:
+            return
+
+        key = (member.guild.id, member.id)
         author_name = str(member)
         author_icon = member.display_avatar.url
-        
-        embed = None
 
         # User joins VC, did not switch 
         if before.channel is None and after.channel is not None:
-            embed = discord.Embed(
-                title="Member Joined Voice Channel", 
-                description=f"{member.mention} joined **#{after.channel.name}**",
-                color=discord.Color.green() # 0x56FF00
-            )
+            task = self._voice_flush_tasks.pop(key, None)
+            if task:
+                task.cancel()
+            if self.voice_sessions.join(member.guild.id, member.id, author_name, author_icon, after.channel.name):
+                logger.debug(f"{author_name} reconnected to voice, continuing their session.")
         # User leaves VC 
         elif before.channel is not None and after.channel is None:
-            embed = discord.Embed(
-                title="Member Left Voice Channel", 
-                description=f"{member.mention} left **#{before.channel.name}**",
-                color=discord.Color.red() # 0xFF0000
-            )
+            self.voice_sessions.leave(member.guild.id, member.id, author_name, author_icon, before.channel.name)
+            task = self._voice_flush_tasks.pop(key, None)
+            if task:
+                task.cancel()
+            self._voice_flush_tasks[key] = asyncio.create_task(self._finish_voice_session_later(key), name=f"voice-session-{member.guild.id}-{member.id}")
         # User switches VC
         elif before.channel is not None and after.channel is not None and before.channel.id != after.channel.id:
-            embed = discord.Embed(
-                title="Member Switched Voice Channel", 
-                description=f"{member.mention} moved from **#{before.channel.name}** to **#{after.channel.name}**",
-                color=discord.Color.yellow() 
-            )
+            self.voice_sessions.move(member.guild.id, member.id, author_name, author_icon, before.channel.name, after.channel.name)
 
-        if embed:
-            embed.set_author(name=author_name, icon_url=author_icon)
-            embed.set_footer(text=footer)
-            await self._send_log_embed(embed)
-            logger.debug(f"Logged voice state update for {author_name}: {embed.title}")
+    async def _finish_voice_session_later(self, key: tuple[int, int]):
+        try:
+            await asyncio.sleep(self.voice_sessions.reconnect_grace)
+        finally:
+            if self._voice_flush_tasks.get(key) is asyncio.current_task():
+                del self._voice_flush_tasks[key]
+        session = self.voice_sessions.finish(*key)
+        if session:
+            await self._send_voice_session_log(session)
+
+    async def _send_voice_session_log(self, session: VoiceSession, still_connected: bool = False):
+        timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
+        footer = f"ID: {session.member_id} | {timestamp}"
+        duration = format_duration(session.connected_seconds)
+
+        if session.started_at is None and not session.connected_seconds:
+            description = f"<@{session.member_id}> left voice (joined before the bot started)"
+        elif session.started_at is None:
+            # Joined before the bot started, so only the part we saw is counted.
+            description = f"<@{session.member_id}> was in voice for at least **{duration}**"
+        else:
+            description = f"<@{session.member_id}> was in voice for **{duration}**"
+        if still_connected:
+            description += "\n*Still connected when the bot shut down.*"
+
+        embed = discord.Embed(
+            title="Voice Session",
+            description=description,
+            color=discord.Color.blue()
+        )
+        embed.set_author(name=session.member_name, icon_url=session.avatar_url)
+        channels_str = " → ".join(name if name == "…" else f"**#{name}**" for name in session.path)
+        if len(channels_str) > 1024:
+            # Long channel names can still overflow the field. Cut from the middle so the last channel stays.
+            last = f" → **#{session.path[-1]}**"
+            channels_str = channels_str[:1024 - len(last) - 2] + " …" + last
+        embed.add_field(name="Channels:", value=channels_str, inline=False)
+        if session.started_at is not None:
+            started = datetime.datetime.fromtimestamp(session.started_at, tz=datetime.timezone.utc)
+            embed.add_field(name="Joined:", value=started.strftime("%I:%M %p UTC"), inline=True)
+        if session.reconnects:
+            embed.add_field(name="Reconnects:", value=str(session.reconnects), inline=True)
+        embed.set_footer(text=footer)
+
+        await self._send_log_embed(embed, session.guild_id)
+        logger.debug(f"Logged voice session for {session.member_name}: {duration} across {len(session.path)} channel(s)")
 
 
     # This listens for new users.
@@ -281,14 +589,18 @@ class ServerEventsCog(commands.Cog, name="Server Logging"):
             webhook_description= "Look at that, the commander user base is growing. 🌱"
         )
 
+        # During a raid or mass invite, fold joins into one welcome per batch instead of one render and send per member.
+        if self.join_bursts.record(member.guild.id):
+            self._queue_burst_join(member)
+            return
+
         #Yippeee! Image generation. Check if it's available.
         if WELCOME_SERVICE_AVAILABLE:
             system_channel = member.guild.system_channel
             if system_channel and system_channel.permissions_for(member.guild.me).send_messages:
                 logger.info(f"Attempting welcome image for {member.name} in {member.guild.name}")
                 try:
-                    avatar_url = member.display_avatar.url 
-                    welcome_file = await generate_image(avatar_url, member.name, member.guild.name) 
+                    welcome_file = await generate_image(member.display_avatar, member.name, member.guild.name) 
                     if welcome_file:
                         await system_channel.send(f"Welcome {member.mention}!", file=welcome_file)
                     else:
@@ -300,7 +612,7 @@ class ServerEventsCog(commands.Cog, name="Server Logging"):
             else:
                  logger.warning(f"Bot lacks permissions to send messages in system channel of '{member.guild.name}'.")
         
-        if not self.log_channel_id:
+        if self._log_channel_id_for(member.guild.id, LogEvent.JOINS) is None:
             return
 
         #Get some info for the embed.
@@ -337,14 +649,95 @@ class ServerEventsCog(commands.Cog, name="Server Logging"):
         embed.set_thumbnail(url=author_icon)
         embed.set_footer(text=footer)
         
-        await self._send_log_embed(embed)
+        await self._send_log_embed(embed, member.guild.id)
         logger.info(f"Logged member join: {author_name} to {member.guild.name}")
 
 
+    # Queues a member that joined during a burst. The batch is sent after JOIN_BURST_FLUSH_DELAY seconds.
+    def _queue_burst_join(self, member: discord.Member):
+        guild_id = member.guild.id
+        self._pending_joins.setdefault(guild_id, []).append(member)
+        task = self._join_flush_tasks.get(guild_id)
+        if task is None or task.done():
+            self._join_flush_tasks[guild_id] = asyncio.create_task(self._flush_burst_joins(guild_id), name=f"join-burst-{guild_id}")
+
+    async def _flush_burst_joins(self, guild_id: int):
+        try:
+            # Keep sending batches for as long as members keep arriving during the burst.
+            while self._pending_joins.get(guild_id):
+                await asyncio.sleep(JOIN_BURST_FLUSH_DELAY)
+                await self._send_burst_joins(guild_id)
+        finally:
+            if self._join_flush_tasks.get(guild_id) is asyncio.current_task():
+                del self._join_flush_tasks[guild_id]
+
+    # Sends one welcome message (and one log embed) for every member waiting in the guild's batch.
+    async def _send_burst_joins(self, guild_id: int):
+        members = self._pending_joins.pop(guild_id, [])
+        if not members:
+            return
+        guild = members[0].guild
+        logger.info(f"Sending coalesced welcome for {len(members)} member(s) in {guild.name}")
+
+        if WELCOME_SERVICE_AVAILABLE:
+            system_channel = guild.system_channel
+            if system_channel and system_channel.permissions_for(guild.me).send_messages:
+                try:
+                    welcome_file = None
+                    if JOIN_BURST_COMPOSITE:
+                        welcome_file = await generate_group_image([m.display_avatar for m in members], guild.name, len(members))
+
+                    # Discord messages are capped at 2000 characters, so long batches are split across messages.
+                    chunks = []
+                    current = "Welcome"
+                    for m in members:
+                        if len(current) + len(m.mention) + 2 > 2000:
+                            chunks.append(current)
+                            current = "Welcome"
+                        current += f" {m.mention}"
+                    chunks.append(current + "!")
+                    for i, chunk in enumerate(chunks):
+                        if i == 0 and welcome_file:
+                            await system_channel.send(chunk, file=welcome_file)
+                        else:
+                            await system_channel.send(chunk)
+                except Exception as e:
+                    logger.error(f"Failed to send coalesced welcome in {guild.name}: {e}", exc_info=True)
+            elif not system_channel:
+                logger.warning(f"Guild '{guild.name}' has no system channel set for welcome messages.")
+            else:
+                logger.warning(f"Bot lacks permissions to send messages in system channel of '{guild.name}'.")
+
+        if self._log_channel_id_for(guild.id, LogEvent.JOINS) is None:
+            return
+
+        timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
+        lines = []
+        description_length = 0
+        for i, m in enumerate(members):
+            line = f"{m.mention} {m.name}"
+            if description_length + len(line) + 1 > 4000:
+                lines.append(f"...and {len(members) - i} more")
+                break
+            lines.append(line)
+            description_length += len(line) + 1
+
+        embed = discord.Embed(
+            title=f"{len(members)} Members Joined (Join Burst)",
+            description="\n".join(lines),
+            color=discord.Color.green()
+        )
+        embed.add_field(name="Member Count", value=f"{guild.member_count}", inline=True)
+        embed.set_footer(text=f"Guild ID: {guild.id} | {timestamp}")
+
+        await self._send_log_embed(embed, guild.id)
+        logger.info(f"Logged coalesced join of {len(members)} member(s) to {guild.name}")
+
+
     # This listens for users leaving.
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
-        if member.bot or not self.log_channel_id:
+        if member.bot or self._log_channel_id_for(member.guild.id, LogEvent.LEAVES) is None:
             return
 
         timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
@@ -391,14 +784,21 @@ class ServerEventsCog(commands.Cog, name="Server Logging"):
             webhook_description= "Look at that, the commander user base is... dying 🥀"
         )
 
-        await self._send_log_embed(embed)
+        await self._send_log_embed(embed, member.guild.id)
         logger.info(f"Logged member leave: {author_name} from {member.guild.name}")
 
 
     # This listens for user updates such as name, avatar, etc.
     @commands.Cog.listener()
     async def on_user_update(self, before: discord.User, after: discord.User):
-        if before.bot or not self.log_channel_id:
+        if before.bot or not self.log_index.logs_any(LogEvent.USER_UPDATES):
+            return
+        # Only names and avatars are logged, other profile changes (e.g. display name) are dropped here.
+        if before.name == after.name and before.discriminator == after.discriminator and before.avatar == after.avatar:
+            return
+
+        channel_ids = self._user_update_channel_ids(after.id)
+        if not channel_ids:
             return
 
         timestamp = discord.utils.utcnow().strftime(f"%A, %B {get_ordinal(discord.utils.utcnow().day)} %Y, at %I:%M %p UTC")
@@ -428,10 +828,27 @@ class ServerEventsCog(commands.Cog, name="Server Logging"):
 
         if embed:
             embed.set_footer(text=footer)
-            await self._send_log_embed(embed)
+            for channel_id in channel_ids:
+                await self._send_log_embed_to(embed, channel_id)
             logger.debug(f"Logged user update for {str(after)}: {embed.title}")
 
 
+    # Users aren't tied to a guild, so log to every log channel of the guilds we share with them (once per channel).
+    # Without a default channel only the few guilds that log user updates need checking, not every guild the bot is in.
+    def _user_update_channel_ids(self, user_id: int) -> set[int]:
+        if self.log_index.default_channel_id is None:
+            guilds = [self.bot.get_guild(guild_id) for guild_id in self.log_index.guilds_logging(LogEvent.USER_UPDATES)]
+        else:
+            guilds = self.bot.guilds
+        channel_ids = set()
+        for guild in guilds:
+            if guild is not None and guild.get_member(user_id) is not None:
+                channel_id = self._log_channel_id_for(guild.id, LogEvent.USER_UPDATES)
+                if channel_id is not None:
+                    channel_ids.add(channel_id)
+        return channel_ids
+
+
 # Setup the cog
 async def setup(bot: commands.Bot):
     await bot.add_cog(ServerEventsCog(bot))
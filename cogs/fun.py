@@ -3,12 +3,14 @@ from discord import app_commands
 from discord.ext import commands
 import logging
 from services.send_event import send_event
-from services.cocktail_service import get_cocktail_embed
+from services.cocktail_catalog import get_cocktail, start_cocktail_catalog, stop_cocktail_catalog
 from services.eightball_service import get_eightball_reading
 from services.joke_service import get_joke
 from services.meme_service import get_meme_url
 from services.qotd_service import get_qotd
 from services.activity_service import get_activity
+from services.reservoir import start_reservoirs, stop_reservoirs
+from services.command_timing import stage
 
 
 # Get a logger for this Cog
@@ -22,14 +24,26 @@ class FunCog(commands.Cog):
         self.bot = bot
         logger.info("FunCog initialized.")
 
+    # Start pre-fetching content for the random commands, so the first users don't wait on the APIs either.
+    async def cog_load(self):
+        start_reservoirs()
+        start_cocktail_catalog()
+
+    async def cog_unload(self):
+        stop_reservoirs()
+        stop_cocktail_catalog()
+
     # Our cocktail command because i know a lot of alcoholics
     @app_commands.command(name="cocktail", description="Get a random cocktail suggestion.")
-    async def cocktail(self, interaction: discord.Interaction):
-        """Sends a random cocktail recipe."""
-        logger.info(f"Cocktail command triggered by {interaction.user.name}")
-        await interaction.response.defer() 
+    @app_commands.describe(ingredient="Only suggest cocktails with this ingredient.", name="Look up a cocktail by name.")
+    async def cocktail(self, interaction: discord.Interaction, ingredient: str = None, name: str = None):
+        """Sends a random cocktail recipe, optionally by ingredient or name."""
+        logger.info(f"Cocktail command triggered by {interaction.user.name} (ingredient: {ingredient}, name: {name})")
+        with stage('defer'):
+            await interaction.response.defer()
         
-        cocktail_embed = get_cocktail_embed()
+        with stage('upstream'):
+            cocktail_embed = await get_cocktail(ingredient=ingredient, name=name)
         
         # Send event to theslow.net
         send_event(
@@ -47,7 +61,11 @@ class FunCog(commands.Cog):
         )
 
         if cocktail_embed:
-            await interaction.followup.send(embed=cocktail_embed)
+            with stage('send'):
+                await interaction.followup.send(embed=cocktail_embed)
+        elif ingredient or name:
+            looking_for = " and ".join(filter(None, [f"**{ingredient}**" if ingredient else None, f"the name **{name}**" if name else None]))
+            await interaction.followup.send(f"Sorry, I couldn't find a cocktail with {looking_for}.", ephemeral=True)
         else:
             logger.error("Failed to get cocktail embed from service.")
             await interaction.followup.send("Sorry, I couldn't mix a cocktail suggestion right now. Please try again later.", ephemeral=True)
@@ -58,9 +76,11 @@ class FunCog(commands.Cog):
     async def eightball(self, interaction: discord.Interaction, question: str):
         """Provides a magic 8-ball reading."""
         logger.info(f"Eightball command triggered by {interaction.user.name} with question: '{question}'")
-        await interaction.response.defer()
+        with stage('defer'):
+            await interaction.response.defer()
         
-        reading = get_eightball_reading()
+        with stage('upstream'):
+            reading = await get_eightball_reading()
         
         # Send event to theslow.net
         send_event(
@@ -78,7 +98,8 @@ class FunCog(commands.Cog):
         )
 
         if reading:
-            await interaction.followup.send(f"You asked: \"{question}\"\nThe Magic 8-Ball says: **{reading}**")
+            with stage('send'):
+                await interaction.followup.send(f"You asked: \"{question}\"\nThe Magic 8-Ball says: **{reading}**")
         else:
             logger.error("Failed to get 8ball reading from service.")
             await interaction.followup.send("Sorry, the Magic 8-Ball seems cloudy right now. Please try again later.", ephemeral=True)
@@ -88,9 +109,12 @@ class FunCog(commands.Cog):
     async def joke(self, interaction: discord.Interaction):
         """Sends a random joke."""
         logger.info(f"Joke command triggered by {interaction.user.name}")
-        await interaction.response.defer()
+        with stage('defer'):
+            await interaction.response.defer()
         
-        joke_text = get_joke()
+        # Repeats are tracked per server, or per DM channel.
+        with stage('upstream'):
+            joke_text = await get_joke(interaction.guild_id or interaction.channel_id)
         
         # Send event to theslow.net
         send_event(
@@ -108,7 +132,8 @@ class FunCog(commands.Cog):
         )
 
         if joke_text:
-            await interaction.followup.send(joke_text)
+            with stage('send'):
+                await interaction.followup.send(joke_text)
         else:
             logger.error("Failed to get joke from service.")
             await interaction.followup.send("Sorry, I couldn't think of a joke right now. Please try again later.", ephemeral=True)
@@ -118,9 +143,11 @@ class FunCog(commands.Cog):
     async def meme(self, interaction: discord.Interaction):
         """Sends a random meme URL."""
         logger.info(f"Meme command triggered by {interaction.user.name}")
-        await interaction.response.defer()
+        with stage('defer'):
+            await interaction.response.defer()
         
-        meme_url = get_meme_url()
+        with stage('upstream'):
+            meme_url = await get_meme_url(interaction.guild_id or interaction.channel_id)
 
         # Send event to theslow.net
         send_event(
@@ -138,7 +165,8 @@ class FunCog(commands.Cog):
         )
         
         if meme_url:
-            await interaction.followup.send(meme_url)
+            with stage('send'):
+                await interaction.followup.send(meme_url)
         else:
             logger.error("Failed to get meme URL from service.")
             await interaction.followup.send("Sorry, the meme stash is empty right now. Please try again later.", ephemeral=True)
@@ -148,9 +176,11 @@ class FunCog(commands.Cog):
     async def qotd(self, interaction: discord.Interaction):
         """Sends the quote of the day."""
         logger.info(f"QOTD command triggered by {interaction.user.name}")
-        await interaction.response.defer()
+        with stage('defer'):
+            await interaction.response.defer()
         
-        quote = get_qotd()
+        with stage('upstream'):
+            quote = await get_qotd()
 
         # Send event to theslow.net
         send_event(
@@ -168,7 +198,8 @@ class FunCog(commands.Cog):
         )
         
         if quote:
-            await interaction.followup.send(quote)
+            with stage('send'):
+                await interaction.followup.send(quote)
         else:
             logger.error("Failed to get QOTD from service.")
             await interaction.followup.send("Sorry, I couldn't find the quote of the day. Please try again later.", ephemeral=True)
@@ -178,9 +209,11 @@ class FunCog(commands.Cog):
     async def bored(self, interaction: discord.Interaction):
         """Suggests a random activity."""
         logger.info(f"Bored command triggered by {interaction.user.name}")
-        await interaction.response.defer()
+        with stage('defer'):
+            await interaction.response.defer()
         
-        activity = get_activity()
+        with stage('upstream'):
+            activity = await get_activity()
 
         # Send event to theslow.net
         send_event(
@@ -198,7 +231,8 @@ class FunCog(commands.Cog):
         )
         
         if activity:
-            await interaction.followup.send(f"Feeling bored? Why not try this:\n**{activity}**")
+            with stage('send'):
+                await interaction.followup.send(f"Feeling bored? Why not try this:\n**{activity}**")
         else:
             logger.error("Failed to get activity from service.")
             await interaction.followup.send("Sorry, I'm out of ideas right now. Maybe browse Reddit?", ephemeral=True)
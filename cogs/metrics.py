@@ -0,0 +1,134 @@
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+import os
+import logging
+from services.metrics_collector import MetricsCollector
+from services.send_metrics import send_metrics
+from services.command_timing import get_command_latency_summary
+from services.metrics_registry import start_metrics_server, stop_metrics_server
+from services.loop_watchdog import watchdog, start_loop_watchdog, stop_loop_watchdog
+
+logger = logging.getLogger(__name__)
+
+METRICS_INTERVAL = float(os.getenv('SLOWSTATS_METRICS_INTERVAL', 300))
+# Optional Prometheus endpoint. 0 leaves it off. Only bound to localhost unless METRICS_HOST says otherwise.
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+
+def _format_ms(seconds: float | None) -> str:
+    return f"{seconds * 1000:.0f}ms" if seconds is not None else "-"
+
+
+def _format_percentiles(stats: dict) -> str:
+    return f"p50 {_format_ms(stats['p50'])} · p95 {_format_ms(stats['p95'])} · p99 {_format_ms(stats['p99'])}"
+
+# Samples bot gauges on a fixed interval and ships them to SlowStats as one batch.
+class MetricsCog(commands.Cog, name="Metrics"):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.collector = MetricsCollector()
+        logger.info(f"MetricsCog initialized. Sending metrics every {METRICS_INTERVAL} seconds.")
+
+    async def cog_load(self):
+        start_loop_watchdog()
+        self.send_metrics_loop.change_interval(seconds=METRICS_INTERVAL)
+        self.send_metrics_loop.start()
+        if METRICS_PORT:
+            try:
+                await start_metrics_server(METRICS_HOST, METRICS_PORT)
+            except OSError as e:
+                logger.error(f"Could not serve Prometheus metrics on {METRICS_HOST}:{METRICS_PORT}: {e}")
+
+    async def cog_unload(self):
+        self.send_metrics_loop.cancel()
+        stop_loop_watchdog()
+        await stop_metrics_server()
+
+    @tasks.loop(seconds=300)
+    async def send_metrics_loop(self):
+        metrics = self.collector.snapshot(self.bot.latency)
+        await send_metrics(metrics)
+        logger.debug(f"Sent metrics to SlowStats: {metrics}")
+
+    @send_metrics_loop.before_loop
+    async def before_send_metrics_loop(self):
+        # Don't send anything until we know how many guilds and members there are.
+        await self.bot.wait_until_ready()
+        if not self.collector.seeded:
+            self.collector.seed(self.bot.guilds)
+
+    @send_metrics_loop.error
+    async def send_metrics_loop_error(self, error: Exception):
+        logger.error(f"Metrics loop crashed: {error}", exc_info=error)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self.collector.guild_joined(guild.member_count)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.collector.guild_left(guild.member_count)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.collector.member_joined()
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.collector.member_left()
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: app_commands.Command | app_commands.ContextMenu):
+        self.collector.command_used(command.qualified_name.replace(" ", "_"))
+
+    @app_commands.command(name="stats", description="Show command latency percentiles (bot owner only).")
+    async def stats(self, interaction: discord.Interaction):
+        """Shows p50/p95/p99 per command and per stage since the bot started."""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("Sorry, only the bot owner can use this command.", ephemeral=True)
+            return
+
+        summary = get_command_latency_summary()
+        embed = discord.Embed(title="Command Latency", color=0x8c00ff)
+        if not summary:
+            embed.description = "No commands have been timed yet."
+        # Busiest commands first. Discord allows 25 fields per embed.
+        for command_name, stats in sorted(summary.items(), key=lambda item: -item[1]["count"])[:25]:
+            lines = [f"**{stats['count']}** run(s) · {_format_percentiles(stats)}"]
+            for stage_name, stage_stats in sorted(stats["stages"].items()):
+                lines.append(f"`{stage_name}` {_format_percentiles(stage_stats)}")
+            embed.add_field(name=f"/{command_name}", value="\n".join(lines)[:1024], inline=False)
+        embed.set_footer(text="Percentiles are estimated from histogram buckets.")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+    @app_commands.command(name="stalls", description="Show recent event loop stalls (bot owner only).")
+    async def stalls(self, interaction: discord.Interaction):
+        """Shows the most recent event loop stalls, with what was running and where."""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("Sorry, only the bot owner can use this command.", ephemeral=True)
+            return
+
+        stalls = watchdog.recent_stalls()
+        embed = discord.Embed(title="Event Loop Stalls", color=0x8c00ff)
+        if not stalls:
+            embed.description = f"No stalls over {watchdog.threshold * 1000:.0f}ms since the bot started."
+        for stall in stalls[:5]:
+            # Innermost frames last, like a traceback. Trim from the outside to fit the field.
+            stack = "".join(stall.stack[-6:]) if stall.stack else "Stack not captured, the stall was over before the watchdog looked.\n"
+            prefix = f"<t:{int(stall.started_at)}:R>\n```"
+            stack = stack[-(1024 - len(prefix) - 3):]
+            embed.add_field(
+                name=f"{stall.duration * 1000:.0f}ms in {stall.task_name or 'unknown task'}"[:256],
+                value=f"{prefix}{stack}```",
+                inline=False
+            )
+        embed.set_footer(text=f"{len(stalls)} stall(s) kept · threshold {watchdog.threshold * 1000:.0f}ms")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MetricsCog(bot))
+    logger.info("Cog 'MetricsCog' loaded successfully.")
@@ -2,8 +2,11 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import os
+import asyncio
 import logging
 from services.send_event import send_event
+from services.city_index import city_index, load_city_index
+from services.command_timing import stage
 
 logger = logging.getLogger(__name__)
 
@@ -37,10 +40,13 @@ class UtilityCog(commands.Cog, name="Utility"):
         else:
              logger.info("UtilityCog initialized successfully.")
 
+    async def cog_load(self):
+        # The full OpenWeatherMap city list takes a moment to parse, so keep it off the event loop.
+        await asyncio.to_thread(load_city_index)
 
     # The big boy weather command. man was I ever proud of this one when i first made this project.
     @app_commands.command(name="weather", description="Get the weather for a specified city.")
-    @app_commands.describe(city="The city name (e.g., 'London' or 'London,UK').")
+    @app_commands.describe(city="The city name (e.g., 'London' or 'London,UK'). Pick a suggestion for an exact match.")
     async def weather(self, interaction: discord.Interaction, city: str):
         """
         Slash command to fetch and display weather information using the weather service.
@@ -50,7 +56,8 @@ class UtilityCog(commands.Cog, name="Utility"):
             city (str): The city provided by the user.
         """
         logger.info(f"/weather command used by {interaction.user} (ID: {interaction.user.id}) in server '{interaction.guild.name}' (ID: {interaction.guild.id}) for city: '{city}'")
-        await interaction.response.defer(ephemeral=True) 
+        with stage('defer'):
+            await interaction.response.defer(ephemeral=True)
 
         # If no API key, get lost. 
         if not self.weather_api_key:
@@ -74,7 +81,8 @@ class UtilityCog(commands.Cog, name="Utility"):
         )
 
         try:
-            weather_embed = get_weather_embed(city, self.weather_api_key)
+            with stage('upstream'):
+                weather_embed = await get_weather_embed(city, self.weather_api_key)
         except Exception as e:
             logger.error(f"An unexpected error occurred calling get_weather_embed for city '{city}': {e}", exc_info=True)
             weather_embed = None
@@ -85,11 +93,17 @@ class UtilityCog(commands.Cog, name="Utility"):
                  logger.warning(f"Weather service returned an error embed for '{city}': {weather_embed.title}")
             else:
                  logger.debug(f"Successfully received weather embed for '{city}'.")
-            await interaction.followup.send(embed=weather_embed, ephemeral=True)
+            with stage('send'):
+                await interaction.followup.send(embed=weather_embed, ephemeral=True)
         else:
             logger.error(f"Weather service returned None for city '{city}'. Sending generic failure message.")
             await interaction.followup.send(f"Sorry, there was an error fetching the weather for '{city}'. Could not connect to the weather service or an unexpected error occurred. Please try again later.", ephemeral=True)
 
+    @weather.autocomplete('city')
+    async def city_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        #Suggests cities from the offline index. The value is the OpenWeatherMap ID, so the lookup is exact.
+        return [app_commands.Choice(name=label[:100], value=f"id:{city_id}") for label, city_id in city_index.search(current)]
+
 
 async def setup(bot: commands.Bot):
     """
@@ -1,27 +1,15 @@
-import requests
 import logging
+from services.http_client import get_json
+from services.reservoir import create_reservoir, single_item
+from services.fallback_content import get_fallback
 
 logger = logging.getLogger(__name__)
 
-#Makes the API request.
-def _make_request(url: str) -> dict | None:
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        if 'application/json' in response.headers.get('Content-Type', ''):
-            return response.json()
-        else:
-            logger.error(f"Non-JSON response from {url}: {response.headers.get('Content-Type')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed for {url}: {e}")
-        return None
-
-def get_activity() -> str | None:
+async def _fetch_activity() -> str | None:
     #Fetches a random activity from the Bored API.
     url = "https://bored-api.appbrewery.com/random"
     logger.debug(f"Requesting activity from {url}")
-    data = _make_request(url)
+    data = await get_json(url, hedge=True)
     
     if data and 'activity' in data:
         activity = data['activity']
@@ -30,3 +18,9 @@ def get_activity() -> str | None:
     else:
         logger.error(f"Failed to fetch or parse activity. Data: {data}")
         return None
+
+
+activity_reservoir = create_reservoir('bored', single_item(_fetch_activity), default_size=5, default_low=2)
+
+async def get_activity() -> str | None:
+    return await activity_reservoir.get() or get_fallback('activities')
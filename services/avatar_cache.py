@@ -0,0 +1,128 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class AvatarCache:
+    """
+    Two-tier cache of processed (resized and circle-cropped) avatars, keyed by avatar hash.
+
+    The memory tier is a small LRU of encoded PNG bytes. The disk tier survives restarts, is capped
+    at `disk_budget_bytes` and evicts the least recently used files first. Disk I/O runs in a thread
+    so the event loop never waits on it.
+    """
+    def __init__(self, directory: str, memory_entries: int, disk_budget_bytes: int):
+        self.directory = directory
+        self.memory_entries = max(0, memory_entries)
+        self.disk_budget_bytes = max(0, disk_budget_bytes)
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+        self._lock = asyncio.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _load_disk_index(self):
+        # Oldest first, so the front of the OrderedDict is always the next file to evict.
+        index = OrderedDict()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith('.png')]
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries:
+                index[entry.name[:-4]] = entry.stat().st_size
+        except OSError as e:
+            logger.error(f"Could not read avatar cache directory '{self.directory}': {e}")
+        self._disk = index
+        self._disk_bytes = sum(index.values())
+        logger.info(f"Avatar disk cache: {len(index)} file(s), {self._disk_bytes // 1024} KB.")
+
+    def _remember(self, key: str, data: bytes):
+        if not self.memory_entries:
+            return
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes, evict: list[str]):
+        for old_key in evict:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(key), 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning(f"Could not write avatar '{key}' to disk cache: {e}")
+
+    async def get(self, key: str) -> bytes | None:
+        """Returns the processed avatar for a key, or None on a miss."""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return data
+
+        async with self._lock:
+            if self._disk is None:
+                await asyncio.to_thread(self._load_disk_index)
+        if self.disk_budget_bytes and key in self._disk:
+            data = await asyncio.to_thread(self._read_disk, key)
+            if data is not None:
+                self._disk.move_to_end(key)
+                self._remember(key, data)
+                self.disk_hits += 1
+                return data
+            self._disk_bytes -= self._disk.pop(key, 0)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes):
+        """Stores a processed avatar in both tiers, evicting the least recently used files if needed."""
+        self._remember(key, data)
+        if not self.disk_budget_bytes or len(data) > self.disk_budget_bytes:
+            return
+
+        async with self._lock:
+            if self._disk is None:
+                await asyncio.to_thread(self._load_disk_index)
+            self._disk_bytes -= self._disk.pop(key, 0)
+            evict = []
+            while self._disk and self._disk_bytes + len(data) > self.disk_budget_bytes:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                evict.append(old_key)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+        await asyncio.to_thread(self._write_disk, key, data, evict)
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk) if self._disk is not None else 0,
+            "disk_bytes": self._disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,176 @@
+import os
+import csv
+import gzip
+import json
+import logging
+import unicodedata
+from bisect import bisect_left
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+# Bundled list of well known cities with their OpenWeatherMap IDs, used for /weather autocomplete.
+CITY_CSV_PATH = os.getenv('CITY_CSV_PATH', 'res/cities.csv')
+# Optional: OpenWeatherMap's full city.list.json (or .json.gz) from bulk.openweathermap.org, for every city they know.
+WEATHER_CITY_LIST = os.getenv('WEATHER_CITY_LIST', '')
+# Discord shows at most 25 autocomplete choices.
+MAX_CHOICES = 25
+# How many prefix matches are ranked per keystroke. Keeps short prefixes cheap on the full list.
+MAX_SCAN = 2000
+# Cities only in the full list rank after every bundled one.
+UNRANKED = 1_000_000
+
+
+def fold(text: str) -> str:
+    #Lowercases and strips accents, so "sao paulo" finds "São Paulo".
+    text = unicodedata.normalize('NFKD', text)
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).lower().split())
+
+
+class CityIndex:
+    """
+    Offline city lookup for /weather, answering autocomplete without any network access.
+
+    Cities are kept as a sorted list of (folded name, rank, id) so a prefix search is a bisect plus a
+    short scan. Rank is the city's position in the bundled CSV (biggest and best known first), which
+    decides the order of the choices shown.
+    """
+    def __init__(self):
+        self._entries: list[tuple[str, int, int]] = []
+        # City ID -> (name, country, state)
+        self._cities: dict[int, tuple[str, str, str]] = {}
+        # Folded "name" and "name,country" -> the best ranked city ID, for resolving typed-in text.
+        self._exact: dict[str, int] = {}
+        # The first MAX_CHOICES IDs by rank, shown before anything is typed.
+        self._top: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+    def __contains__(self, city_id: int) -> bool:
+        return city_id in self._cities
+
+    def _build(self, cities: dict[int, tuple[str, str, str]], ranks: dict[int, int]):
+        entries = sorted((fold(name), ranks.get(city_id, UNRANKED), city_id) for city_id, (name, _, _) in cities.items())
+        exact = {}
+        # Walk best rank first so the best known city keeps each exact name, e.g. "london" is London, GB.
+        for key, rank, city_id in sorted(entries, key=lambda entry: entry[1]):
+            country = cities[city_id][1].lower()
+            exact.setdefault(key, city_id)
+            exact.setdefault(f"{key},{country}", city_id)
+        top = [city_id for _, _, city_id in sorted(entries, key=lambda entry: entry[1])[:MAX_CHOICES]]
+
+        # The CSV is parsed in a worker thread while autocomplete keeps calling search() on the loop,
+        # so nothing above touched self and the finished structures are assigned last.
+        self._cities = cities
+        self._entries = entries
+        self._exact = exact
+        self._top = top
+
+    def _read_csv(self, path: str) -> tuple[dict, dict]:
+        cities, ranks = {}, {}
+        with open(path, encoding='utf-8', newline='') as f:
+            for rank, row in enumerate(csv.DictReader(f)):
+                city_id = int(row['id'])
+                cities[city_id] = (row['name'], row['country'], row.get('state') or '')
+                ranks[city_id] = rank
+        return cities, ranks
+
+    def load_csv(self, path: str = CITY_CSV_PATH) -> bool:
+        """Loads the bundled city list. Returns False if it couldn't be read."""
+        try:
+            cities, ranks = self._read_csv(path)
+        except Exception as e:
+            logger.error(f"Failed to load city list from {path}: {e}", exc_info=True)
+            return False
+        self._build(cities, ranks)
+        logger.info(f"City index loaded {len(cities)} cities from {path}.")
+        return True
+
+    def load_city_list(self, path: str, csv_path: str = CITY_CSV_PATH) -> bool:
+        """
+        Loads OpenWeatherMap's full city.list.json on top of the bundled list. Blocking, run it in a thread.
+
+        Args:
+            path (str): Path to city.list.json, optionally gzipped.
+            csv_path (str): The bundled CSV, still used to rank the best known cities first.
+
+        Returns:
+            bool: False if the file couldn't be read, in which case the current index is kept.
+        """
+        try:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            cities, ranks = self._read_csv(csv_path) if os.path.exists(csv_path) else ({}, {})
+            for city in data:
+                cities.setdefault(int(city['id']), (city['name'], city.get('country', ''), city.get('state', '')))
+        except Exception as e:
+            logger.error(f"Failed to load OpenWeatherMap city list from {path}: {e}", exc_info=True)
+            return False
+        self._build(cities, ranks)
+        logger.info(f"City index loaded {len(cities)} cities from {path}.")
+        return True
+
+    def label(self, city_id: int) -> str:
+        name, country, state = self._cities[city_id]
+        return ", ".join(part for part in (name, state, country) if part)
+
+    def search(self, text: str, limit: int = MAX_CHOICES) -> list[tuple[str, int]]:
+        """
+        Finds cities whose name starts with the typed text, best known first.
+
+        Args:
+            text (str): What the user has typed so far. Anything after a comma narrows by state or country, e.g. "portland, or".
+            limit (int): The most results to return.
+
+        Returns:
+            list[tuple[str, int]]: (label, city ID) pairs, e.g. ("London, GB", 2643743).
+        """
+        name, _, region = text.partition(',')
+        key = fold(name)
+        region = fold(region)
+        if not key:
+            return [(self.label(city_id), city_id) for city_id in self._top[:limit]]
+
+        matches = []
+        start = bisect_left(self._entries, (key,))
+        for entry in islice(self._entries, start, start + MAX_SCAN):
+            if not entry[0].startswith(key):
+                break
+            if region:
+                _, country, state = self._cities[entry[2]]
+                if not (country.lower().startswith(region) or state.lower().startswith(region)):
+                    continue
+            matches.append(entry)
+        # Exact names before longer ones, then by rank, so "paris" lists Paris, FR before Parish.
+        matches.sort(key=lambda entry: (entry[0] != key, entry[1], entry[0]))
+        return [(self.label(city_id), city_id) for _, _, city_id in matches[:limit]]
+
+    def resolve(self, text: str) -> int | None:
+        """
+        Maps a /weather city value to an OpenWeatherMap city ID, if there's a confident match.
+
+        Accepts an autocomplete value ("id:2643743"), an exact name ("London") or a name with a
+        country ("London,GB"). Anything else returns None and is looked up by name instead.
+        """
+        text = text.strip()
+        if text.lower().startswith('id:'):
+            city_id = text[3:].strip()
+            return int(city_id) if city_id.isdigit() else None
+        name, _, region = text.partition(',')
+        key = fold(name)
+        region = fold(region)
+        if region:
+            return self._exact.get(f"{key},{region}")
+        return self._exact.get(key)
+
+
+city_index = CityIndex()
+
+
+def load_city_index() -> bool:
+    #Blocking. Loads the full OpenWeatherMap list if one is configured, otherwise the bundled CSV.
+    if WEATHER_CITY_LIST and city_index.load_city_list(WEATHER_CITY_LIST):
+        return True
+    return city_index.load_csv()
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import string
+from bisect import bisect_left
+from itertools import islice
+
+import discord
+
+from services.cocktail_service import parse_drink, build_cocktail_embed, get_cocktail_embed, fetch_drinks
+
+logger = logging.getLogger(__name__)
+
+# Optional: keep TheCocktailDB's whole catalog (a few hundred drinks) locally, so /cocktail never waits on the API.
+COCKTAIL_CATALOG = os.getenv('COCKTAIL_CATALOG', 'false').lower() in ('1', 'true', 'yes')
+COCKTAIL_CATALOG_PATH = os.getenv('COCKTAIL_CATALOG_PATH', 'data/cocktails.json')
+COCKTAIL_CATALOG_REFRESH_HOURS = float(os.getenv('COCKTAIL_CATALOG_REFRESH_HOURS', 24))
+# Pause between the per-letter search requests of a download, to go easy on the free API.
+DOWNLOAD_DELAY = 0.5
+
+
+class CocktailCatalog:
+    """
+    Local copy of TheCocktailDB, with indexes for picking drinks by ingredient or name.
+
+    The catalog is downloaded with one search.php?f=<letter> request per letter and digit, saved as JSON,
+    and reloaded from that file on the next start. Embeds are built once when the catalog is indexed;
+    callers get a copy so they can't change the stored one.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.cocktails: list[dict] = []
+        self.fetched_at = 0.0
+        self._embeds: list[discord.Embed] = []
+        # Lowercased ingredient or ingredient word -> indexes into cocktails, plus the sorted keys for prefix matches.
+        self._by_ingredient: dict[str, list[int]] = {}
+        self._ingredient_keys: list[str] = []
+        # Sorted (lowercased name, index) pairs for prefix matches on names.
+        self._names: list[tuple[str, int]] = []
+        self._task: asyncio.Task | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.cocktails)
+
+    def _index(self, cocktails: list[dict], fetched_at: float):
+        by_ingredient: dict[str, list[int]] = {}
+        for index, cocktail in enumerate(cocktails):
+            # Index whole ingredients and their words, so "vermouth" finds "Dry Vermouth" and "Sweet Vermouth".
+            keys = set()
+            for _, ingredient in cocktail['ingredients']:
+                ingredient = ingredient.lower()
+                keys.add(ingredient)
+                keys.update(word for word in ingredient.split() if len(word) > 2)
+            for key in keys:
+                by_ingredient.setdefault(key, []).append(index)
+        embeds = [build_cocktail_embed(cocktail) for cocktail in cocktails]
+
+        # Swap everything in at once, so a pick never sees a half built index.
+        self.cocktails = cocktails
+        self.fetched_at = fetched_at
+        self._embeds = embeds
+        self._by_ingredient = by_ingredient
+        self._ingredient_keys = sorted(by_ingredient)
+        self._names = sorted((cocktail['name'].lower(), index) for index, cocktail in enumerate(cocktails))
+        logger.info(f"Cocktail catalog indexed: {len(cocktails)} drinks, {len(by_ingredient)} ingredient search terms.")
+
+    def _load_file(self) -> tuple[list[dict], float] | None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        cocktails = [{**cocktail, 'ingredients': [tuple(pair) for pair in cocktail['ingredients']]} for cocktail in data['cocktails']]
+        return cocktails, data['fetched_at']
+
+    def _save_file(self, cocktails: list[dict], fetched_at: float):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': fetched_at, 'cocktails': cocktails}, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    async def load(self) -> bool:
+        """Loads the catalog saved by a previous download. Returns False if there isn't one."""
+        try:
+            saved = await asyncio.to_thread(self._load_file)
+        except Exception as e:
+            logger.error(f"Failed to read cocktail catalog from {self.path}: {e}", exc_info=True)
+            return False
+        if not saved:
+            return False
+        self._index(*saved)
+        return True
+
+    async def download(self) -> bool:
+        """Downloads the whole catalog, saves it and swaps it in. Keeps the current catalog if the download fails."""
+        cocktails = {}
+        for letter in string.ascii_lowercase + string.digits:
+            # Letters without drinks come back empty, same as a failed request. The size check below catches real failures.
+            drinks = await fetch_drinks("search.php", {'f': letter})
+            for drink in drinks or []:
+                cocktail = parse_drink(drink)
+                cocktails[cocktail['id']] = cocktail
+            await asyncio.sleep(DOWNLOAD_DELAY)
+
+        if not cocktails:
+            logger.error("Cocktail catalog download returned no drinks, keeping the current catalog.")
+            return False
+        # Too small compared to what we had means most requests failed, so don't replace a good catalog with it.
+        if len(cocktails) < len(self.cocktails) // 2:
+            logger.error(f"Cocktail catalog download only returned {len(cocktails)} drinks (had {len(self.cocktails)}), keeping the current catalog.")
+            return False
+
+        cocktail_list = sorted(cocktails.values(), key=lambda cocktail: cocktail['name'].lower())
+        fetched_at = time.time()
+        try:
+            await asyncio.to_thread(self._save_file, cocktail_list, fetched_at)
+        except Exception as e:
+            logger.error(f"Failed to save cocktail catalog to {self.path}: {e}", exc_info=True)
+        self._index(cocktail_list, fetched_at)
+        return True
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(), name="cocktail-catalog")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        # Use the saved copy right away, then download whenever it's older than the refresh interval.
+        await self.load()
+        refresh_seconds = COCKTAIL_CATALOG_REFRESH_HOURS * 3600
+        while True:
+            age = time.time() - self.fetched_at
+            if age >= refresh_seconds:
+                logger.info("Downloading cocktail catalog from TheCocktailDB.")
+                if not await self.download():
+                    # Try again in an hour rather than waiting a whole refresh interval.
+                    await asyncio.sleep(min(3600, refresh_seconds))
+                    continue
+                age = 0
+            await asyncio.sleep(refresh_seconds - age)
+
+    def _ingredient_matches(self, ingredient: str) -> list[int]:
+        key = ingredient.strip().lower()
+        if key in self._by_ingredient:
+            return self._by_ingredient[key]
+        # No exact ingredient, so take every ingredient starting with it, e.g. "lime" also finds "lime juice".
+        matches = []
+        start = bisect_left(self._ingredient_keys, key)
+        for other in islice(self._ingredient_keys, start, None):
+            if not other.startswith(key):
+                break
+            matches.extend(self._by_ingredient[other])
+        return matches
+
+    def _name_matches(self, name: str) -> list[int]:
+        key = name.strip().lower()
+        start = bisect_left(self._names, (key,))
+        matches = []
+        for other, index in islice(self._names, start, None):
+            if not other.startswith(key):
+                break
+            if other == key:
+                return [index]
+            matches.append(index)
+        return matches
+
+    def pick(self, ingredient: str = None, name: str = None) -> discord.Embed | None:
+        """
+        Picks a cocktail from the catalog without any network access.
+
+        Args:
+            ingredient (str): Only cocktails with this ingredient (or one starting with it).
+            name (str): Only the cocktail with this name, or one whose name starts with it.
+
+        Returns:
+            discord.Embed | None: A copy of the cocktail's embed, or None if nothing matched.
+        """
+        candidates = None
+        if ingredient:
+            candidates = set(self._ingredient_matches(ingredient))
+        if name:
+            by_name = self._name_matches(name)
+            candidates = set(by_name) if candidates is None else candidates.intersection(by_name)
+        if candidates is None:
+            return self._embeds[random.randrange(len(self._embeds))].copy()
+        if not candidates:
+            return None
+        return self._embeds[random.choice(list(candidates))].copy()
+
+
+catalog = CocktailCatalog(COCKTAIL_CATALOG_PATH)
+
+
+def start_cocktail_catalog():
+    if COCKTAIL_CATALOG:
+        catalog.start()
+
+
+def stop_cocktail_catalog():
+    catalog.stop()
+
+
+async def get_cocktail(ingredient: str = None, name: str = None) -> discord.Embed | None:
+    #Picks from the local catalog once it's loaded, otherwise asks TheCocktailDB.
+    if catalog.loaded:
+        return catalog.pick(ingredient=ingredient, name=name)
+    return await get_cocktail_embed(ingredient=ingredient, name=name)
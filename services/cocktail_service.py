@@ -1,66 +1,117 @@
+import random
 import discord
-import requests
 import logging
+from services.http_client import get_json
+from services.reservoir import create_reservoir, single_item
 
 logger = logging.getLogger(__name__)
 
-#Makes the API request.
-def _make_request(url: str) -> dict | None:
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        if 'application/json' in response.headers.get('Content-Type', ''):
-            return response.json()
+API_BASE = "https://www.thecocktaildb.com/api/json/v1/1"
+
+
+def parse_drink(drink: dict) -> dict:
+    #Keeps only what the embed needs from a TheCocktailDB drink, with the ingredients as a list of (measure, ingredient).
+    ingredients = []
+    for i in range(1, 16):
+        ingredient = drink.get(f'strIngredient{i}')
+        measure = drink.get(f'strMeasure{i}')
+        if ingredient and ingredient.strip():
+            ingredients.append((measure.strip() if measure else '', ingredient.strip()))
         else:
-            logger.error(f"Non-JSON response from {url}: {response.headers.get('Content-Type')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed for {url}: {e}")
+            break
+    return {
+        'id': drink.get('idDrink'),
+        'name': drink.get('strDrink') or 'Unknown Cocktail',
+        'category': drink.get('strCategory') or 'Unknown Category',
+        'instructions': drink.get('strInstructions') or 'No instructions available.',
+        'image_url': drink.get('strDrinkThumb'),
+        'ingredients': ingredients,
+    }
+
+
+def build_cocktail_embed(cocktail: dict) -> discord.Embed:
+    #Formats a parsed cocktail into an embed.
+    name = cocktail['name']
+    ingredients = [f"**-** {measure} {ingredient}" for measure, ingredient in cocktail['ingredients']]
+    ingredients_text = "\n".join(ingredients) if ingredients else "No ingredients listed."
+
+    if not ingredients:
+         logger.warning(f"Cocktail '{name}' fetched with no ingredients.")
+
+    embed = discord.Embed(
+        title=name.title(),
+        description=f"**Ingredients:**\n{ingredients_text}\n\n**Instructions:**\n{cocktail['instructions']}",
+        color=0xDA70D6 # Orchid
+    )
+    embed.set_author(name=cocktail['category'].title())
+    if cocktail['image_url']:
+        embed.set_thumbnail(url=cocktail['image_url'])
+    return embed
+
+
+async def fetch_drinks(endpoint: str, params: dict = None) -> list[dict] | None:
+    url = f"{API_BASE}/{endpoint}"
+    logger.debug(f"Requesting cocktails from {url} {params or ''}")
+    data = await get_json(url, params=params)
+    if not data or not isinstance(data.get('drinks'), list):
         return None
+    return data['drinks']
 
-def get_cocktail_embed() -> discord.Embed | None:
-    #Fetches a random cocktail and formats it into an embed.
-    url = "https://www.thecocktaildb.com/api/json/v1/1/random.php"
-    logger.debug(f"Requesting cocktail from {url}")
-    data = _make_request(url)
 
-    if not data or 'drinks' not in data or not data['drinks']:
+async def _fetch_cocktail_embed() -> discord.Embed | None:
+    #Fetches a random cocktail and formats it into an embed.
+    drinks = await fetch_drinks("random.php")
+    if not drinks:
         logger.error("Failed to fetch or parse cocktail data.")
         return None
 
     try:
-        drink = data['drinks'][0]
-        name = drink.get('strDrink', 'Unknown Cocktail')
-        category = drink.get('strCategory', 'Unknown Category')
-        instructions = drink.get('strInstructions', 'No instructions available.')
-        image_url = drink.get('strDrinkThumb')
-
-        ingredients = []
-        for i in range(1, 16):
-            ingredient = drink.get(f'strIngredient{i}')
-            measure = drink.get(f'strMeasure{i}')
-            if ingredient:
-                ingredients.append(f"**-** {measure.strip() if measure else ''} {ingredient.strip()}")
-            else:
-                break
-
-        ingredients_text = "\n".join(ingredients) if ingredients else "No ingredients listed."
-        
-        if not ingredients:
-             logger.warning(f"Cocktail '{name}' fetched with no ingredients.")
-
-        embed = discord.Embed(
-            title=name.title(),
-            description=f"**Ingredients:**\n{ingredients_text}\n\n**Instructions:**\n{instructions}",
-            color=0xDA70D6 # Orchid
-        )
-        embed.set_author(name=category.title())
-        if image_url:
-            embed.set_thumbnail(url=image_url)
-        
-        logger.info(f"Successfully generated embed for cocktail: {name}")
+        cocktail = parse_drink(drinks[0])
+        embed = build_cocktail_embed(cocktail)
+        logger.info(f"Successfully generated embed for cocktail: {cocktail['name']}")
         return embed
 
     except Exception as e:
         logger.error(f"Error processing cocktail data: {e}", exc_info=True)
         return None
+
+
+async def _search_cocktail_embed(ingredient: str = None, name: str = None) -> discord.Embed | None:
+    # Live lookups for when the local catalog isn't loaded.
+    if name:
+        drinks = await fetch_drinks("search.php", {'s': name})
+        if not drinks:
+            return None
+        exact = [d for d in drinks if (d.get('strDrink') or '').lower() == name.lower()]
+        drink = exact[0] if exact else random.choice(drinks)
+        if ingredient and not any(i.lower() == ingredient.lower() for _, i in parse_drink(drink)['ingredients']):
+            return None
+    else:
+        # The ingredient filter only returns names and IDs, so the full recipe takes a second request.
+        matches = await fetch_drinks("filter.php", {'i': ingredient})
+        if not matches:
+            return None
+        drinks = await fetch_drinks("lookup.php", {'i': random.choice(matches).get('idDrink')})
+        if not drinks:
+            return None
+        drink = drinks[0]
+    return build_cocktail_embed(parse_drink(drink))
+
+
+# A few cocktails are kept ready so /cocktail doesn't wait on TheCocktailDB.
+cocktail_reservoir = create_reservoir('cocktail', single_item(_fetch_cocktail_embed), default_size=5, default_low=2)
+
+async def get_cocktail_embed(ingredient: str = None, name: str = None) -> discord.Embed | None:
+    """
+    Returns a cocktail embed from TheCocktailDB, random unless narrowed down by ingredient and/or name.
+
+    Args:
+        ingredient (str): Only cocktails containing this ingredient.
+        name (str): Only cocktails with this name, or a random one whose name contains it.
+
+    Returns:
+        discord.Embed | None: The embed, or None if nothing matched or the API failed.
+    """
+    if ingredient or name:
+        return await _search_cocktail_embed(ingredient=ingredient, name=name)
+    return await cocktail_reservoir.get()
@@ -0,0 +1,112 @@
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import discord
+from discord import app_commands
+
+from services.metrics_registry import registry
+
+logger = logging.getLogger(__name__)
+
+command_total = registry.counter("commander_commands_total", "Slash commands run, by outcome.", ("command", "outcome"))
+command_seconds = registry.histogram("commander_command_duration_seconds", "Time from receiving a slash command to its handler finishing.", ("command",))
+stage_seconds = registry.histogram("commander_command_stage_seconds", "Time spent in each stage of a slash command.", ("command", "stage"))
+commands_in_flight = registry.gauge("commander_commands_in_flight", "Slash commands currently running.")
+
+# The command the current task is handling. Stages timed inside it are attributed to it.
+_current_command: ContextVar[str | None] = ContextVar("current_command", default=None)
+
+
+def _command_name(interaction: discord.Interaction) -> str:
+    command = interaction.command
+    if command is not None:
+        return command.qualified_name.replace(" ", "_")
+    return (interaction.data or {}).get("name", "unknown")
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Times a block as one stage of the running command, e.g. 'defer', 'upstream', 'build' or 'send'.
+
+    Does nothing outside a slash command, so services can use it freely.
+    """
+    command = _current_command.get()
+    if command is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(command, name, value=time.perf_counter() - started)
+
+
+def command_finished(interaction: discord.Interaction, outcome: str):
+    #Records how long a command took. Called once per command by the tree, however it ended.
+    started = interaction.extras.pop("started_at", None)
+    if started is None:
+        return
+    name = _command_name(interaction)
+    command_seconds.observe(name, value=time.perf_counter() - started)
+    command_total.inc(name, outcome)
+    commands_in_flight.dec()
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """
+    Command tree that times every slash command, without each command having to do it itself.
+
+    `interaction_check` runs in the task that goes on to run the command, so it stamps the start time,
+    names the task after the command (handy in stack dumps) and marks the command as current for `stage`.
+    `_call` wraps the whole dispatch and records the duration when it ends, so no cog has to be loaded
+    for commands to be timed.
+    """
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is discord.InteractionType.application_command:
+            name = _command_name(interaction)
+            interaction.extras["started_at"] = time.perf_counter()
+            commands_in_flight.inc()
+            _current_command.set(name)
+            task = asyncio.current_task()
+            if task is not None:
+                task.set_name(f"command-{name}-{interaction.id}")
+        return True
+
+    async def _call(self, interaction: discord.Interaction):
+        # discord.py has no public "command finished" hook on the tree, only the bot-level completion
+        # event. Wrapping _call covers success, errors and checks failing alike.
+        outcome = "error"
+        try:
+            await super()._call(interaction)
+            if not interaction.command_failed:
+                outcome = "ok"
+        finally:
+            command_finished(interaction, outcome)
+
+
+def get_command_latency_summary() -> dict[str, dict]:
+    """
+    Returns p50/p95/p99 in seconds per command, and per stage of each command.
+
+    Returns:
+        dict: {command: {"count", "p50", "p95", "p99", "stages": {stage: {"count", "p50", "p95", "p99"}}}}
+    """
+    def percentiles(histogram, *labels) -> dict:
+        return {
+            "count": histogram.count(*labels),
+            "p50": histogram.quantile(0.50, *labels),
+            "p95": histogram.quantile(0.95, *labels),
+            "p99": histogram.quantile(0.99, *labels),
+        }
+
+    summary = {}
+    for (command,) in command_seconds.series():
+        summary[command] = {**percentiles(command_seconds, command), "stages": {}}
+    for command, stage_name in stage_seconds.series():
+        entry = summary.setdefault(command, {"count": 0, "p50": None, "p95": None, "p99": None, "stages": {}})
+        entry["stages"][stage_name] = percentiles(stage_seconds, command, stage_name)
+    return summary
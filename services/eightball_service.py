@@ -1,28 +1,17 @@
-import requests
 import logging
+from services.http_client import get_json
+from services.reservoir import create_reservoir, single_item
+from services.fallback_content import get_fallback
 
 logger = logging.getLogger(__name__)
 
-#Makes the API request.
-def _make_request(url: str, params: dict = None) -> dict | None:
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        if 'application/json' in response.headers.get('Content-Type', ''):
-            return response.json()
-        else:
-            logger.error(f"Non-JSON response from {url}: {response.headers.get('Content-Type')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed for {url}: {e}")
-        return None
-
-def get_eightball_reading() -> str | None:
+async def _fetch_eightball_reading() -> str | None:
     url = "https://eightballapi.com/api"
     # The API requires a question, but because I don't know what they do with the questions, we are just putting a placeholder in. And lucky because false confidence works. 
     params = {'question': 'Will I succeed?', 'lucky': 'true'} 
     logger.debug(f"Requesting 8ball reading from {url}")
-    data = _make_request(url, params=params)
+    # One free reading per request, so a hedged duplicate costs nothing.
+    data = await get_json(url, params=params, hedge=True)
 
     if data and 'reading' in data:
         reading = data['reading']
@@ -31,3 +20,11 @@ def get_eightball_reading() -> str | None:
     else:
         logger.error(f"Failed to fetch or parse 8ball reading. Data: {data}")
         return None
+
+
+eightball_reservoir = create_reservoir('eightball', single_item(_fetch_eightball_reading), default_size=10, default_low=3)
+
+async def get_eightball_reading() -> str | None:
+    # The reading doesn't depend on the question, so it can be fetched ahead of time.
+    # While eightballapi.com is down, a classic answer from the bundled list will do.
+    return await eightball_reservoir.get() or get_fallback('eightball')
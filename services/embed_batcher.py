@@ -0,0 +1,121 @@
+import asyncio
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord limits: 10 embeds per message, 6000 characters across all embeds in a message.
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+class EmbedBatcher:
+    """
+    Per-channel outbound buffer that packs log embeds into as few messages as possible.
+
+    Embeds are sent in the order they were added. A channel's buffer is flushed when it holds
+    MAX_EMBEDS_PER_MESSAGE embeds or `flush_interval` seconds after its first embed arrived,
+    whichever comes first. A flush that would go over the combined character limit is split
+    across several messages.
+    """
+    def __init__(self, flush_interval: float = 2.0):
+        self.flush_interval = flush_interval
+        self._buffers: dict[int, list[discord.Embed]] = {}
+        self._channels: dict[int, discord.abc.Messageable] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._flushes: set[asyncio.Task] = set()
+        self.embeds_sent = 0
+        self.messages_sent = 0
+
+    def add(self, channel: discord.abc.Messageable, embed: discord.Embed):
+        """Buffers an embed for a channel. Never waits on the network."""
+        buffer = self._buffers.setdefault(channel.id, [])
+        self._channels[channel.id] = channel
+        buffer.append(embed)
+
+        # Only the add that fills the buffer triggers a flush, the flush then takes everything buffered by the time it runs.
+        if len(buffer) == MAX_EMBEDS_PER_MESSAGE:
+            task = asyncio.create_task(self.flush(channel.id), name=f"embed-batch-{channel.id}")
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif channel.id not in self._timers:
+            self._timers[channel.id] = asyncio.create_task(self._flush_later(channel.id), name=f"embed-batch-timer-{channel.id}")
+
+    async def _flush_later(self, channel_id: int):
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            if self._timers.get(channel_id) is asyncio.current_task():
+                del self._timers[channel_id]
+        await self.flush(channel_id)
+
+    async def flush(self, channel_id: int):
+        """Sends everything buffered for a channel."""
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        # The lock keeps flushes for one channel in order, even when a full buffer and a timer race.
+        async with lock:
+            embeds = self._buffers.pop(channel_id, None)
+            channel = self._channels.get(channel_id)
+            if not embeds or channel is None:
+                return
+            for chunk in _chunk_embeds(embeds):
+                await self._send(channel, chunk)
+
+    async def send_with_file(self, channel: discord.abc.Messageable, embed: discord.Embed, file: discord.File):
+        """Sends an embed with an attachment right away, after whatever is already buffered for the channel."""
+        lock = self._locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            embeds = self._buffers.pop(channel.id, None)
+            for chunk in _chunk_embeds(embeds or []):
+                await self._send(channel, chunk)
+            await self._send(channel, [embed], file=file)
+
+    async def flush_all(self):
+        for task in list(self._timers.values()):
+            task.cancel()
+        self._timers.clear()
+        for channel_id in list(self._buffers):
+            await self.flush(channel_id)
+
+    async def _send(self, channel: discord.abc.Messageable, embeds: list[discord.Embed], file: discord.File = None):
+        channel_name = getattr(channel, 'name', channel.id)
+        try:
+            if file:
+                await channel.send(embeds=embeds, file=file)
+            else:
+                await channel.send(embeds=embeds)
+            self.embeds_sent += len(embeds)
+            self.messages_sent += 1
+        except discord.Forbidden:
+            logger.error(f"Bot lacks permissions to send messages in log channel: {channel_name} (ID: {channel.id})")
+        except discord.HTTPException as e:
+            logger.error(f"Failed to send log message to {channel_name}: {e}", exc_info=True)
+        except Exception as e:
+            logger.error(f"An unexpected error occurred sending log to {channel_name}: {e}", exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": sum(len(buffer) for buffer in self._buffers.values()),
+            "embeds_sent": self.embeds_sent,
+            "messages_sent": self.messages_sent,
+        }
+
+
+def _chunk_embeds(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    # Splits embeds into consecutive groups that each fit in one message.
+    chunks = []
+    current = []
+    current_chars = 0
+    for embed in embeds:
+        embed_chars = len(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or current_chars + embed_chars > MAX_EMBED_CHARS_PER_MESSAGE):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+        current.append(embed)
+        current_chars += embed_chars
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,47 @@
+import os
+import json
+import random
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bundled answers, activities, jokes and quotes, served when an upstream API is down or its circuit breaker is open.
+FALLBACK_CONTENT_PATH = os.getenv('FALLBACK_CONTENT_PATH', 'res/fallbacks.json')
+
+_corpora: dict[str, list] | None = None
+_served: dict[str, int] = {}
+
+
+def _load() -> dict[str, list]:
+    global _corpora
+    if _corpora is None:
+        try:
+            with open(FALLBACK_CONTENT_PATH, encoding='utf-8') as f:
+                _corpora = json.load(f)
+            logger.info(f"Loaded fallback content from {FALLBACK_CONTENT_PATH}: {', '.join(f'{len(items)} {kind}' for kind, items in _corpora.items())}")
+        except Exception as e:
+            logger.error(f"Failed to load fallback content from {FALLBACK_CONTENT_PATH}: {e}", exc_info=True)
+            _corpora = {}
+    return _corpora
+
+
+def get_fallback(kind: str):
+    """
+    Returns a random bundled item, for when the real API can't answer.
+
+    Args:
+        kind (str): 'eightball', 'activities', 'jokes' or 'quotes' (a [quote, author] pair).
+
+    Returns:
+        The item, or None if there's no bundled content of that kind.
+    """
+    items = _load().get(kind)
+    if not items:
+        return None
+    _served[kind] = _served.get(kind, 0) + 1
+    logger.info(f"Serving a bundled fallback for '{kind}'.")
+    return random.choice(items)
+
+
+def get_fallback_stats() -> dict[str, int]:
+    return dict(_served)
@@ -0,0 +1,74 @@
+import os
+import enum
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LogEvent(enum.IntFlag):
+    """The kinds of server events a guild can log. Stored per guild as a bitmask."""
+    MESSAGE_EDITS = 1
+    MESSAGE_DELETES = 2
+    VOICE = 4
+    JOINS = 8
+    LEAVES = 16
+    USER_UPDATES = 32
+    ALL = MESSAGE_EDITS | MESSAGE_DELETES | VOICE | JOINS | LEAVES | USER_UPDATES
+
+
+class GuildConfigStore:
+    """
+    Small SQLite store for per-guild settings, currently which channel each guild logs to and which events it logs.
+
+    Every call opens its own short-lived connection, so methods can safely be run in a worker
+    thread with asyncio.to_thread.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS log_channels ("
+            " guild_id INTEGER PRIMARY KEY,"
+            " channel_id INTEGER NOT NULL,"
+            f" events INTEGER NOT NULL DEFAULT {int(LogEvent.ALL)}"
+            ")"
+        )
+        # Databases from before per-event settings don't have the events column yet.
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(log_channels)")}
+        if 'events' not in columns:
+            with connection:
+                connection.execute(f"ALTER TABLE log_channels ADD COLUMN events INTEGER NOT NULL DEFAULT {int(LogEvent.ALL)}")
+            logger.info(f"Added events column to log_channels in {self.path}.")
+        return connection
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        connection = self._connect()
+        try:
+            with connection:
+                return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def load_log_channels(self) -> dict[int, tuple[int, LogEvent]]:
+        """Returns every configured {guild_id: (log_channel_id, logged events)}."""
+        rows = self._execute("SELECT guild_id, channel_id, events FROM log_channels")
+        return {guild_id: (channel_id, LogEvent(events) & LogEvent.ALL) for guild_id, channel_id, events in rows}
+
+    def set_log_channel(self, guild_id: int, channel_id: int):
+        self._execute(
+            "INSERT INTO log_channels (guild_id, channel_id) VALUES (?, ?)"
+            " ON CONFLICT(guild_id) DO UPDATE SET channel_id = excluded.channel_id",
+            (guild_id, channel_id),
+        )
+
+    def set_log_events(self, guild_id: int, events: LogEvent):
+        self._execute("UPDATE log_channels SET events = ? WHERE guild_id = ?", (int(events), guild_id))
+
+    def clear_log_channel(self, guild_id: int):
+        self._execute("DELETE FROM log_channels WHERE guild_id = ?", (guild_id,))
@@ -0,0 +1,217 @@
+import os
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from services.upstream_health import health_for
+
+logger = logging.getLogger(__name__)
+
+# Every upstream host gets its own pooled keep-alive session, so one slow API can only tie up its own connections.
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_LIMIT_PER_HOST = int(os.getenv('HTTP_LIMIT_PER_HOST', 10))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 30))
+# Hedged GETs still running after the host's recent p95 latency get a second copy sent, and the first answer wins.
+# Only callers that pass hedge=True are hedged: cheap, free, single-item APIs where a duplicate request costs nothing.
+HTTP_HEDGE = os.getenv('HTTP_HEDGE', 'true').lower() in ('1', 'true', 'yes')
+
+_sessions: dict[str, aiohttp.ClientSession] = {}
+# Set by close_sessions. A session opened after that would never be closed.
+_closed = False
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Raised instead of making a request while the host's circuit breaker is open."""
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit breaker open for {host}, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def _host_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _get_session(url: str) -> aiohttp.ClientSession:
+    #Returns the pooled session for the host of the URL, creating it on first use.
+    host = _host_of(url)
+    session = _sessions.get(host)
+    if session is None or session.closed:
+        if _closed:
+            raise aiohttp.ClientError(f"HTTP sessions are closed, not opening one for {host}")
+        connector = aiohttp.TCPConnector(
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout, raise_for_status=False)
+        _sessions[host] = session
+        logger.debug(f"Opened HTTP session for {host}")
+    return session
+
+
+def _timeout_for(timeout: float | None) -> aiohttp.ClientTimeout | None:
+    if timeout is None:
+        return None
+    return aiohttp.ClientTimeout(total=timeout, connect=min(timeout, HTTP_CONNECT_TIMEOUT))
+
+
+async def _request_json_once(method: str, url: str, params: dict, json, headers: dict, timeout: float) -> dict | list:
+    session = _get_session(url)
+    async with session.request(method, url, params=params, json=json, headers=headers, timeout=_timeout_for(timeout)) as response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if 'application/json' not in content_type:
+            # A 200 HTML page is usually a captive portal or a CDN error page, i.e. the API isn't really answering.
+            raise aiohttp.ContentTypeError(response.request_info, response.history, status=response.status, message=f"Expected JSON, got {content_type or 'no content type'}", headers=response.headers)
+        return await response.json(content_type=None)
+
+
+async def _hedged(make_request, delay: float, health):
+    #Runs a request, and a second copy of it if the first hasn't finished after `delay`. The first success wins.
+    first = asyncio.create_task(make_request())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return first.result()
+
+        health.hedges += 1
+        tasks.append(asyncio.create_task(make_request()))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        health.hedge_wins += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # The loser (or both, if we were cancelled) is still holding a connection.
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def _is_host_failure(error: BaseException) -> bool:
+    #Whether an error says the host is unhealthy. A 404 or 401 is the host working fine, an HTML page instead of JSON isn't.
+    if isinstance(error, aiohttp.ContentTypeError):
+        return True
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+async def request_json(method: str, url: str, *, params: dict = None, json=None, headers: dict = None, timeout: float = None, hedge: bool = False) -> dict | list | None:
+    """
+    Performs a request against an upstream API and decodes the JSON body.
+
+    Each host has a circuit breaker: once it keeps failing, requests fail fast with CircuitOpenError
+    instead of waiting out the timeout. With `hedge`, GETs to a healthy host are hedged past its recent p95 latency.
+
+    Args:
+        method (str): The HTTP method, e.g. 'GET' or 'POST'.
+        url (str): The full URL of the endpoint.
+        params (dict): Optional query string parameters.
+        json: Optional JSON-serialisable request body.
+        headers (dict): Optional request headers.
+        timeout (float): Optional total timeout in seconds, overriding HTTP_TIMEOUT.
+        hedge (bool): Allow a second copy of a slow GET. Leave off for keyed, quota-limited or batch endpoints.
+
+    Returns:
+        dict | list | None: The decoded JSON body.
+
+    Raises:
+        CircuitOpenError: If the host's circuit breaker is open.
+        aiohttp.ContentTypeError: If the upstream answered with something other than JSON. Counts against the breaker.
+        aiohttp.ClientResponseError: If the upstream answered with an error status.
+        aiohttp.ClientError | asyncio.TimeoutError: If the request could not be completed.
+    """
+    host = _host_of(url)
+    health = health_for(host)
+    if not health.allow():
+        raise CircuitOpenError(host, health.retry_in())
+
+    def make_request():
+        return _request_json_once(method, url, params, json, headers, timeout)
+
+    started = time.monotonic()
+    ok = None
+    try:
+        delay = health.hedge_delay() if hedge and HTTP_HEDGE and method == 'GET' else None
+        result = await (_hedged(make_request, delay, health) if delay is not None else make_request())
+        ok = True
+        return result
+    except Exception as e:
+        ok = not _is_host_failure(e)
+        raise
+    finally:
+        health.record(ok, time.monotonic() - started)
+
+
+async def get_json(url: str, params: dict = None, timeout: float = None, hedge: bool = False) -> dict | list | None:
+    #GETs a JSON document, logging and swallowing any failure so services can just check for None.
+    try:
+        return await request_json('GET', url, params=params, timeout=timeout, hedge=hedge)
+    except CircuitOpenError as e:
+        logger.debug(f"Skipped request to {url}: {e}")
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"Request failed for {url}: {e.status} {e.message}")
+    except asyncio.TimeoutError:
+        logger.error(f"Request timed out for {url}")
+    except (aiohttp.ClientError, ValueError) as e:
+        logger.error(f"Request failed for {url}: {e}")
+    return None
+
+
+async def get_bytes(url: str, params: dict = None, timeout: float = None) -> bytes | None:
+    #GETs a raw body (e.g. an image), logging and swallowing any failure.
+    try:
+        session = _get_session(url)
+        async with session.get(url, params=params, timeout=_timeout_for(timeout)) as response:
+            response.raise_for_status()
+            return await response.read()
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"Request failed for {url}: {e.status} {e.message}")
+    except asyncio.TimeoutError:
+        logger.error(f"Request timed out for {url}")
+    except aiohttp.ClientError as e:
+        logger.error(f"Request failed for {url}: {e}")
+    return None
+
+
+async def post_json(url: str, payload, headers: dict = None, timeout: float = None) -> bool:
+    #POSTs a JSON body. Returns True when the upstream accepted it.
+    try:
+        session = _get_session(url)
+        async with session.post(url, json=payload, headers=headers, timeout=_timeout_for(timeout)) as response:
+            response.raise_for_status()
+            return True
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"POST failed for {url}: {e.status} {e.message}")
+    except asyncio.TimeoutError:
+        logger.error(f"POST timed out for {url}")
+    except aiohttp.ClientError as e:
+        logger.error(f"POST failed for {url}: {e}")
+    return False
+
+
+async def close_sessions():
+    #Closes every pooled session. Called once when the bot shuts down, after which no new sessions are opened.
+    global _closed
+    _closed = True
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    for session in sessions:
+        if not session.closed:
+            await session.close()
+    logger.info(f"Closed {len(sessions)} HTTP session(s).")
@@ -0,0 +1,73 @@
+import io
+import logging
+from dataclasses import dataclass
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = ('png', 'webp', 'jpeg')
+
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    """
+    How a rendered image is encoded for upload.
+
+    Attributes:
+        format (str): "png", "webp" or "jpeg".
+        quality (int | None): Quality 1-100 for WebP/JPEG, or zlib compression level 0-9 for PNG.
+                              None uses the encoder's default.
+        width (int | None): Downscale the output to this width (keeping the aspect ratio), or None for full size.
+    """
+    format: str = 'png'
+    quality: int | None = None
+    width: int | None = None
+
+    @property
+    def extension(self) -> str:
+        return 'jpg' if self.format == 'jpeg' else self.format
+
+    def __str__(self) -> str:
+        quality = f" q={self.quality}" if self.quality is not None else ""
+        width = f" w={self.width}" if self.width else ""
+        return f"{self.format}{quality}{width}"
+
+
+def parse_image_encoding(fmt: str, quality: str | None, width: str | None) -> ImageEncoding:
+    #Builds an ImageEncoding from config strings, falling back to full size PNG on anything invalid.
+    fmt = (fmt or 'png').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in IMAGE_FORMATS:
+        logger.warning(f"Unknown image format '{fmt}', falling back to PNG.")
+        return ImageEncoding()
+    try:
+        quality_value = int(quality) if quality else None
+        width_value = int(width) if width else None
+    except ValueError:
+        logger.warning(f"Invalid image quality '{quality}' or width '{width}', using encoder defaults.")
+        return ImageEncoding(fmt)
+    return ImageEncoding(fmt, quality_value, width_value or None)
+
+
+def encode_image(image: Image.Image, encoding: ImageEncoding) -> bytes:
+    """Encodes an image with the given settings and returns the bytes."""
+    if encoding.width and encoding.width < image.width:
+        height = round(image.height * encoding.width / image.width)
+        image = image.resize((encoding.width, height), Image.LANCZOS)
+
+    options = {}
+    if encoding.format == 'png':
+        if encoding.quality is not None:
+            options['compress_level'] = max(0, min(9, encoding.quality))
+    else:
+        if encoding.quality is not None:
+            options['quality'] = max(1, min(100, encoding.quality))
+        if encoding.format == 'jpeg':
+            # JPEG has no alpha channel.
+            image = image.convert('RGB')
+
+    buffer = io.BytesIO()
+    image.save(buffer, encoding.format, **options)
+    return buffer.getvalue()
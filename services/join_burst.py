@@ -0,0 +1,45 @@
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class JoinBurstDetector:
+    """
+    Per-guild sliding window of join times.
+
+    A guild is in a burst while more than `threshold` members joined within the last `window` seconds.
+    Once joins slow down the window drains and the guild falls back to the normal per-member path.
+    """
+    def __init__(self, threshold: int, window: float):
+        self.threshold = max(1, threshold)
+        self.window = window
+        self._joins: dict[int, deque] = {}
+        self._bursting: set[int] = set()
+
+    def record(self, guild_id: int, now: float = None) -> bool:
+        """Records a join and returns True if the guild is currently in a burst."""
+        now = time.monotonic() if now is None else now
+        joins = self._joins.get(guild_id)
+        if joins is None:
+            joins = self._joins[guild_id] = deque()
+        joins.append(now)
+        while joins and now - joins[0] > self.window:
+            joins.popleft()
+
+        bursting = len(joins) > self.threshold
+        if bursting and guild_id not in self._bursting:
+            self._bursting.add(guild_id)
+            logger.warning(f"Join burst detected in guild {guild_id}: {len(joins)} joins in {self.window}s. Coalescing welcome messages.")
+        elif not bursting and guild_id in self._bursting:
+            self._bursting.discard(guild_id)
+            logger.info(f"Join burst in guild {guild_id} has subsided. Back to per-member welcome messages.")
+        return bursting
+
+    def is_bursting(self, guild_id: int) -> bool:
+        return guild_id in self._bursting
+
+    def forget(self, guild_id: int):
+        self._joins.pop(guild_id, None)
+        self._bursting.discard(guild_id)
@@ -1,39 +1,80 @@
-import requests
+import os
 import logging
+from services.http_client import get_json
+from services.reservoir import create_reservoir
+from services.recent_filter import RecentlyServed
+from services.fallback_content import get_fallback
 
 logger = logging.getLogger(__name__)
 
-#Makes the API request.
-def _make_request(url: str, params: dict = None) -> dict | None:
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        if 'application/json' in response.headers.get('Content-Type', ''):
-            return response.json()
-        else:
-            logger.error(f"Non-JSON response from {url}: {response.headers.get('Content-Type')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed for {url}: {e}")
-        return None
-
-def get_joke() -> str | None:
-    # I've decided to blacklist racist and sexist jokes because this is going on github. If you're reading this, racist and sexist jokes are BAD!!!!!!! 
+# JokeAPI returns up to 10 jokes per request.
+JOKE_BATCH_SIZE = 10
+# How many recent jokes each server is guaranteed not to see again.
+JOKE_REPEAT_WINDOW = int(os.getenv('JOKE_REPEAT_WINDOW', 50))
+
+_stats = {"served": 0, "repeats": 0}
+
+
+async def _fetch_jokes() -> list[tuple[int, str]]:
+    #Fetches a batch of jokes as (id, text) pairs.
+    # I've decided to blacklist racist and sexist jokes because this is going on github. If you're reading this, racist and sexist jokes are BAD!!!!!!!
     url = "https://v2.jokeapi.dev/joke/Any"
     params = {
         'blacklistFlags': 'racist,sexist',
-        'type': 'single'
+        'type': 'single',
+        'amount': JOKE_BATCH_SIZE
     }
-    logger.debug(f"Requesting joke from {url}")
-    data = _make_request(url, params=params)
+    logger.debug(f"Requesting jokes from {url}")
+    data = await get_json(url, params=params)
 
-    if data and data.get('error') is False and 'joke' in data:
-        joke_text = data['joke']
-        logger.info("Successfully fetched joke.")
-        return joke_text
+    if data and data.get('error') is False:
+        # A batch comes back as a list under 'jokes', a single joke as the top-level object.
+        jokes = data.get('jokes', [data])
+        batch = [(joke.get('id', joke['joke']), joke['joke']) for joke in jokes if 'joke' in joke]
+        logger.info(f"Successfully fetched {len(batch)} joke(s).")
+        return batch
     elif data and data.get('error') is True:
          logger.error(f"JokeAPI returned an error: {data.get('message')}")
-         return None
+         return []
     else:
         logger.error(f"Failed to fetch or parse joke. Data: {data}")
-        return None
+        return []
+
+
+joke_reservoir = create_reservoir('joke', _fetch_jokes, default_size=30, default_low=10)
+recent_jokes = RecentlyServed(JOKE_REPEAT_WINDOW)
+
+async def get_joke(guild_id: int = None) -> str | None:
+    """
+    Returns a joke, skipping ones recently told in the same server if possible.
+
+    Args:
+        guild_id (int): The server (or DM channel) asking, for repeat suppression. None skips it.
+
+    Returns:
+        str | None: The joke, a bundled one if JokeAPI couldn't be reached, or None if there's none of those either.
+    """
+    accept = (lambda joke: not recent_jokes.seen(guild_id, joke[0])) if guild_id is not None else None
+    joke = await joke_reservoir.get(accept)
+    if joke is None:
+        return get_fallback('jokes')
+
+    joke_id, joke_text = joke
+    if guild_id is not None:
+        # Only happens when even a fresh batch had nothing new for this server.
+        if recent_jokes.seen(guild_id, joke_id):
+            _stats["repeats"] += 1
+        recent_jokes.add(guild_id, joke_id)
+    _stats["served"] += 1
+    return joke_text
+
+
+def get_joke_stats() -> dict:
+    #Upstream requests saved is jokes served minus requests made, thanks to batching.
+    fetches = joke_reservoir.fetches
+    return {
+        "served": _stats["served"],
+        "fetches": fetches,
+        "fetches_saved": max(0, _stats["served"] - fetches),
+        "repeats": _stats["repeats"],
+    }
@@ -0,0 +1,65 @@
+import logging
+
+from services.guild_config import LogEvent
+
+logger = logging.getLogger(__name__)
+
+
+class LogIndex:
+    """
+    In-memory index of where each guild logs and which events it logs.
+
+    Gateway listeners fire for every guild the bot is in, most of which log nothing. This keeps the
+    answer to "does anyone care about this event?" down to a dict or set lookup, so listeners can drop
+    irrelevant events before doing any formatting. Guilds without their own log channel use
+    `default_channel_id` for every event, if one is set.
+    """
+    def __init__(self, default_channel_id: int | None = None):
+        self.default_channel_id = default_channel_id
+        self._routes: dict[int, tuple[int, LogEvent]] = {}
+        # Event -> guilds with their own log channel that log it.
+        self._guilds_by_event: dict[LogEvent, set[int]] = {event: set() for event in LogEvent if event is not LogEvent.ALL}
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def load(self, routes: dict[int, tuple[int, LogEvent]]):
+        self._routes = {}
+        for guilds in self._guilds_by_event.values():
+            guilds.clear()
+        for guild_id, (channel_id, events) in routes.items():
+            self.set_route(guild_id, channel_id, events)
+
+    def set_route(self, guild_id: int, channel_id: int, events: LogEvent = LogEvent.ALL):
+        self._routes[guild_id] = (channel_id, events)
+        for event, guilds in self._guilds_by_event.items():
+            if events & event:
+                guilds.add(guild_id)
+            else:
+                guilds.discard(guild_id)
+
+    def remove_route(self, guild_id: int):
+        self._routes.pop(guild_id, None)
+        for guilds in self._guilds_by_event.values():
+            guilds.discard(guild_id)
+
+    def route(self, guild_id: int) -> tuple[int, LogEvent] | None:
+        """Returns the guild's own (channel ID, events), or None if it uses the default."""
+        return self._routes.get(guild_id)
+
+    def channel_for(self, guild_id: int | None, event: LogEvent = None) -> int | None:
+        """Returns the channel a guild logs `event` to, or None if it doesn't log it. With no event, just where the guild logs."""
+        route = self._routes.get(guild_id)
+        if route is None:
+            return self.default_channel_id
+        if event is not None and not route[1] & event:
+            return None
+        return route[0]
+
+    def logs_any(self, event: LogEvent) -> bool:
+        """True if at least one guild could log this event."""
+        return self.default_channel_id is not None or bool(self._guilds_by_event[event])
+
+    def guilds_logging(self, event: LogEvent) -> set[int]:
+        """Guilds with their own log channel that log this event. Doesn't include guilds on the default channel."""
+        return self._guilds_by_event[event]
@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+
+from services.metrics_registry import registry
+
+logger = logging.getLogger(__name__)
+
+LOOP_WATCHDOG = os.getenv('LOOP_WATCHDOG', 'true').lower() in ('1', 'true', 'yes')
+# How often the heartbeat ticks, and how late a tick has to be to count as a stall.
+LOOP_WATCHDOG_INTERVAL = float(os.getenv('LOOP_WATCHDOG_INTERVAL_MS', 100)) / 1000
+LOOP_STALL_THRESHOLD = float(os.getenv('LOOP_STALL_THRESHOLD_MS', 250)) / 1000
+# Stalls kept for /stalls.
+LOOP_STALL_HISTORY = int(os.getenv('LOOP_STALL_HISTORY', 20))
+# Innermost frames kept per captured stack.
+STACK_DEPTH = 15
+
+loop_lag_seconds = registry.histogram(
+    "commander_event_loop_lag_seconds", "How late the event loop watchdog's heartbeat ran.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+loop_lag_last = registry.gauge("commander_event_loop_lag_last_seconds", "Lag of the most recent watchdog heartbeat.")
+loop_stalls_total = registry.counter("commander_event_loop_stalls_total", "Heartbeats delayed past LOOP_STALL_THRESHOLD_MS.")
+
+
+class Stall:
+    __slots__ = ('started_at', 'duration', 'task_name', 'stack')
+
+    def __init__(self, started_at: float, task_name: str | None, stack: list[str] | None):
+        self.started_at = started_at
+        self.duration = 0.0
+        self.task_name = task_name
+        self.stack = stack
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag and captures what was blocking the loop when it stalls.
+
+    A heartbeat task on the loop records the time of every tick and how late it was. A helper thread
+    checks that time; once the loop has gone quiet for longer than the threshold, it grabs the loop
+    thread's stack with sys._current_frames() and the name of the task that is running, since that's
+    the code holding the loop up right now. When the loop comes back the heartbeat fills in how long
+    the stall lasted and keeps it in a ring buffer.
+    """
+    def __init__(self, interval: float = LOOP_WATCHDOG_INTERVAL, threshold: float = LOOP_STALL_THRESHOLD, history: int = LOOP_STALL_HISTORY):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: deque[Stall] = deque(maxlen=max(1, history))
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._last_tick = 0.0
+        # Set by the helper thread during a stall, picked up by the heartbeat once the loop is back.
+        self._pending: Stall | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self):
+        #Must be called from the running event loop it should watch.
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        # A fresh event per thread, so a thread from before a restart still sees its own stop.
+        self._stop = threading.Event()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Event loop watchdog started (stall threshold {self.threshold * 1000:.0f}ms).")
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            lag = max(0.0, now - started - self.interval)
+            loop_lag_seconds.observe(value=lag)
+            loop_lag_last.set(value=lag)
+            if lag >= self.threshold:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float):
+        stall = self._pending
+        self._pending = None
+        if stall is None:
+            # Over before the helper thread looked, so there's no stack for this one.
+            stall = Stall(time.time() - lag, None, None)
+        stall.duration = lag
+        self.stalls.append(stall)
+        loop_stalls_total.inc()
+        where = stall.task_name or "unknown task"
+        stack = "".join(stall.stack) if stall.stack else "  (stack not captured)\n"
+        logger.warning(f"Event loop stalled for {lag * 1000:.0f}ms in {where}. Loop thread stack:\n{stack}")
+
+    def _watch(self, stop: threading.Event):
+        # Runs in the helper thread. Only reads what the loop thread leaves behind, never touches the loop itself.
+        captured_tick = None
+        while not stop.wait(self.interval / 2):
+            last_tick = self._last_tick
+            behind = time.monotonic() - last_tick - self.interval
+            if behind < self.threshold or captured_tick == last_tick:
+                continue
+            captured_tick = last_tick
+            self._pending = Stall(time.time() - behind, self._running_task_name(), self._loop_stack())
+
+    def _running_task_name(self) -> str | None:
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+        return task.get_name() if task is not None else None
+
+    def _loop_stack(self) -> list[str] | None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        return traceback.format_list(traceback.extract_stack(frame)[-STACK_DEPTH:])
+
+    def recent_stalls(self) -> list[Stall]:
+        #Newest first.
+        return list(reversed(self.stalls))
+
+
+watchdog = LoopWatchdog()
+
+
+def start_loop_watchdog():
+    if LOOP_WATCHDOG:
+        watchdog.start()
+
+
+def stop_loop_watchdog():
+    watchdog.stop()
@@ -1,37 +1,89 @@
-import requests
+import os
 import logging
+from services.http_client import get_json
+from services.reservoir import create_reservoir
+from services.recent_filter import RecentlyServed
 
 logger = logging.getLogger(__name__)
 
-#Makes the API request.
-def _make_request(url: str) -> dict | None:
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        if 'application/json' in response.headers.get('Content-Type', ''):
-            return response.json()
-        else:
-            logger.error(f"Non-JSON response from {url}: {response.headers.get('Content-Type')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed for {url}: {e}")
-        return None
+# meme-api returns up to 50 memes per request.
+MEME_BATCH_SIZE = min(50, int(os.getenv('MEME_BATCH_SIZE', 50)))
+# How many recent memes each server is guaranteed not to see again.
+MEME_REPEAT_WINDOW = int(os.getenv('MEME_REPEAT_WINDOW', 100))
+
+_stats = {"served": 0, "repeats": 0, "filtered": 0, "duplicates": 0}
+# URLs from recent batches, so refills don't stock up on the same hot posts over and over.
+_recent_batches = RecentlyServed(MEME_BATCH_SIZE * 4, max_keys=1)
+
+
+async def _fetch_memes() -> list[str]:
+    #Fetches a batch of memes and returns the SFW, spoiler free image URLs.
+    url = f"https://meme-api.com/gimme/{MEME_BATCH_SIZE}"
+    logger.debug(f"Requesting memes from {url}")
+    data = await get_json(url)
+
+    if not data or not isinstance(data.get('memes'), list):
+        logger.error(f"Failed to fetch or parse memes. Data: {data}")
+        return []
+
+    batch = []
+    batch_urls = set()
+    for meme in data['memes']:
+        meme_url = meme.get('url')
+        if not meme_url:
+            continue
+        # Just like with the joke API, we block NSFW memes because we don't like NSFW memes and this is on github. Also because this grabs memes from reddit and I'm scared what could potentially come from there.
+        # Spoilers go too, an embed shows the image straight away.
+        if meme.get('nsfw') is not False or meme.get('spoiler'):
+            _stats["filtered"] += 1
+            continue
+        if meme_url in batch_urls:
+            _stats["duplicates"] += 1
+            continue
+        batch_urls.add(meme_url)
+        batch.append(meme_url)
+
+    fresh = [meme_url for meme_url in batch if not _recent_batches.seen(None, meme_url)]
+    _stats["duplicates"] += len(batch) - len(fresh)
+    for meme_url in fresh:
+        _recent_batches.add(None, meme_url)
+    logger.info(f"Fetched {len(data['memes'])} meme(s), kept {len(fresh)}.")
+    # A batch of nothing but recent posts still beats an empty one, the per-server filter catches repeats.
+    return fresh or batch
 
-def get_meme_url() -> str | None:
-
-    url = "https://meme-api.com/gimme" 
-    logger.debug(f"Requesting meme from {url}")
-    data = _make_request(url)
-
-    # Just like with the joke API, we block NSFW memes because we don't like NSFW memes and this is on github. Also because this grabs memes from reddit and I'm scared what could potentially come from there.
-    if data and 'url' in data and data.get('nsfw') is False:
-        meme_url = data['url']
-        title = data.get('title', 'Meme')
-        logger.info(f"Successfully fetched meme: {title} ({meme_url})")
-        return meme_url
-    elif data and data.get('nsfw') is True:
-        logger.warning(f"Meme API returned NSFW content, skipping. Data: {data}")
-        return None 
-    else:
-        logger.error(f"Failed to fetch or parse meme URL. Data: {data}")
+
+meme_reservoir = create_reservoir('meme', _fetch_memes, default_size=50, default_low=15)
+recent_memes = RecentlyServed(MEME_REPEAT_WINDOW)
+
+async def get_meme_url(guild_id: int = None) -> str | None:
+    """
+    Returns a SFW meme URL, skipping ones recently shown in the same server if possible.
+
+    Args:
+        guild_id (int): The server (or DM channel) asking, for repeat suppression. None skips it.
+
+    Returns:
+        str | None: The meme's image URL, or None if meme-api couldn't be reached.
+    """
+    accept = (lambda meme_url: not recent_memes.seen(guild_id, meme_url)) if guild_id is not None else None
+    meme_url = await meme_reservoir.get(accept)
+    if meme_url is None:
         return None
+
+    if guild_id is not None:
+        # Only happens when even a fresh batch had nothing new for this server.
+        if recent_memes.seen(guild_id, meme_url):
+            _stats["repeats"] += 1
+        recent_memes.add(guild_id, meme_url)
+    _stats["served"] += 1
+    return meme_url
+
+
+def get_meme_stats() -> dict:
+    #Filtered counts NSFW and spoiler posts dropped, duplicates counts reposts dropped before reaching the reservoir.
+    fetches = meme_reservoir.fetches
+    return {
+        **_stats,
+        "fetches": fetches,
+        "fetches_saved": max(0, _stats["served"] - fetches),
+    }
@@ -0,0 +1,131 @@
+import sys
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class StoredMessage:
+    """
+    The parts of a message the server logger needs to describe an edit or delete, and nothing else.
+    Attachments are kept as a tuple of (filename, size in bytes).
+    """
+    __slots__ = ('id', 'channel_id', 'guild_id', 'author_id', 'author_name', 'author_avatar_url', 'content', 'attachments', 'created_at', 'size')
+
+    def __init__(self, id: int, channel_id: int, guild_id: int, author_id: int, author_name: str, author_avatar_url: str, content: str, attachments: tuple, created_at: float):
+        self.id = id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        # The same few authors post most messages, so their name and avatar strings are shared between records.
+        self.author_name = sys.intern(author_name)
+        self.author_avatar_url = sys.intern(author_avatar_url)
+        self.content = content
+        self.attachments = attachments
+        self.created_at = created_at
+        self.size = _estimate_size(self)
+
+    @classmethod
+    def from_message(cls, message) -> 'StoredMessage':
+        return cls(
+            id=message.id,
+            channel_id=message.channel.id,
+            guild_id=message.guild.id if message.guild else None,
+            author_id=message.author.id,
+            author_name=str(message.author),
+            author_avatar_url=message.author.display_avatar.url,
+            content=message.content,
+            attachments=tuple((att.filename, att.size) for att in message.attachments),
+            created_at=message.created_at.timestamp(),
+        )
+
+
+_RECORD_OVERHEAD = None
+
+def _estimate_size(record: StoredMessage) -> int:
+    # Approximate bytes held by a record: the slotted object, its ints and content, plus the dict entries pointing at it.
+    # Author strings are interned and shared, so they aren't charged to each record.
+    global _RECORD_OVERHEAD
+    if _RECORD_OVERHEAD is None:
+        _RECORD_OVERHEAD = sys.getsizeof(record) + 5 * 32 + 2 * 100
+    size = _RECORD_OVERHEAD + sys.getsizeof(record.content)
+    for filename, _ in record.attachments:
+        size += sys.getsizeof(filename) + 64
+    return size
+
+
+class MessageStore:
+    """
+    Bounded LRU store of StoredMessage records.
+
+    The total size is capped at `max_bytes` and each channel's share at `max_channel_bytes`, so one
+    busy channel can't push every other channel's history out. When either cap is exceeded the least
+    recently used messages are evicted first.
+    """
+    def __init__(self, max_bytes: int, max_channel_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_channel_bytes = max_channel_bytes
+        self._messages: OrderedDict[int, StoredMessage] = OrderedDict()
+        self._channels: dict[int, OrderedDict[int, None]] = {}
+        self._channel_bytes: dict[int, int] = {}
+        self.total_bytes = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add(self, record: StoredMessage):
+        if record.id in self._messages:
+            self.pop(record.id)
+        self._messages[record.id] = record
+        self._channels.setdefault(record.channel_id, OrderedDict())[record.id] = None
+        self._channel_bytes[record.channel_id] = self._channel_bytes.get(record.channel_id, 0) + record.size
+        self.total_bytes += record.size
+
+        channel = self._channels[record.channel_id]
+        while self._channel_bytes[record.channel_id] > self.max_channel_bytes and len(channel) > 1:
+            self._evict(next(iter(channel)))
+        while self.total_bytes > self.max_bytes and len(self._messages) > 1:
+            self._evict(next(iter(self._messages)))
+
+    def _evict(self, message_id: int):
+        self.pop(message_id)
+        self.evicted += 1
+
+    def get(self, message_id: int) -> StoredMessage | None:
+        record = self._messages.get(message_id)
+        if record is not None:
+            self._messages.move_to_end(message_id)
+            self._channels[record.channel_id].move_to_end(message_id)
+        return record
+
+    def pop(self, message_id: int) -> StoredMessage | None:
+        record = self._messages.pop(message_id, None)
+        if record is None:
+            return None
+        channel = self._channels[record.channel_id]
+        del channel[message_id]
+        self._channel_bytes[record.channel_id] -= record.size
+        self.total_bytes -= record.size
+        if not channel:
+            del self._channels[record.channel_id]
+            del self._channel_bytes[record.channel_id]
+        return record
+
+    def update_content(self, message_id: int, content: str) -> StoredMessage | None:
+        """Replaces a stored message's content after an edit, keeping the byte accounting right."""
+        record = self.pop(message_id)
+        if record is None:
+            return None
+        record.content = content
+        record.size = _estimate_size(record)
+        self.add(record)
+        return record
+
+    def stats(self) -> dict:
+        return {
+            "messages": len(self._messages),
+            "channels": len(self._channels),
+            "bytes": self.total_bytes,
+            "evicted": self.evicted,
+        }
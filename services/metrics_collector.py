@@ -0,0 +1,131 @@
+import re
+import logging
+from collections import Counter
+
+from services.send_event import get_event_queue_stats
+from services.reservoir import get_reservoir_stats
+from services.joke_service import get_joke_stats
+from services.meme_service import get_meme_stats
+from services.upstream_health import get_upstream_stats
+from services.fallback_content import get_fallback_stats
+from services.loop_watchdog import loop_stalls_total, loop_lag_seconds, loop_lag_last
+from services.weather_service import get_weather_cache_stats
+from services.welcome_service import get_render_stats, get_avatar_cache_stats
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsCollector:
+    """
+    Aggregates bot gauges locally so they can be sent to SlowStats as one payload per interval.
+
+    Member and guild totals are kept up to date incrementally from gateway events instead of
+    re-summing every guild, and command counts are reset after each snapshot.
+    """
+    def __init__(self):
+        self.total_guilds = 0
+        self.total_members = 0
+        self.seeded = False
+        self.command_counts: Counter = Counter()
+        # Loop lag comes from the watchdog's heartbeat. Its totals at the last snapshot, for the per-interval average.
+        self._lag_sum = 0.0
+        self._lag_samples = 0
+
+    def seed(self, guilds):
+        #Takes the initial totals. Only done once; later reconnects are covered by the join/leave events.
+        self.total_guilds = len(guilds)
+        self.total_members = sum(g.member_count for g in guilds if g.member_count)
+        self.seeded = True
+        logger.info(f"Metrics seeded: {self.total_guilds} guild(s), {self.total_members} member(s).")
+
+    def guild_joined(self, member_count: int | None):
+        self.total_guilds += 1
+        self.total_members += member_count or 0
+
+    def guild_left(self, member_count: int | None):
+        self.total_guilds = max(0, self.total_guilds - 1)
+        self.total_members = max(0, self.total_members - (member_count or 0))
+
+    def member_joined(self):
+        self.total_members += 1
+
+    def member_left(self):
+        self.total_members = max(0, self.total_members - 1)
+
+    def command_used(self, command_name: str):
+        self.command_counts[command_name] += 1
+
+    def snapshot(self, latency: float) -> dict:
+        """
+        Builds the metrics payload for the current interval and resets the per-interval counters.
+
+        Args:
+            latency (float): The gateway latency in seconds, as reported by bot.latency.
+
+        Returns:
+            dict: A flat {metric_name: number} dict for send_metrics.
+        """
+        queue_stats = get_event_queue_stats()
+        lag_sum, lag_samples = loop_lag_seconds.sum(), loop_lag_seconds.count()
+        lag_p99 = loop_lag_seconds.quantile(0.99)
+        metrics = {
+            "total_servers": self.total_guilds,
+            "total_members": self.total_members,
+            "event_queue_depth": queue_stats["depth"],
+            "event_queue_dropped": queue_stats["dropped"],
+            "commands_used": sum(self.command_counts.values()),
+            "loop_lag_last_ms": round(loop_lag_last.value() * 1000, 2),
+            "loop_lag_avg_ms": round((lag_sum - self._lag_sum) / (lag_samples - self._lag_samples) * 1000, 2) if lag_samples > self._lag_samples else 0.0,
+            "loop_lag_p99_ms": round(lag_p99 * 1000, 2) if lag_p99 is not None else 0.0,
+            "loop_stalls": loop_stalls_total.value(),
+        }
+        # latency is inf until the first heartbeat is acknowledged, which isn't a number SlowStats can store.
+        if latency == latency and latency != float('inf'):
+            metrics["gateway_latency_ms"] = round(latency * 1000, 2)
+        for command_name, count in self.command_counts.items():
+            metrics[f"command_{command_name}_used"] = count
+        for name, stats in get_reservoir_stats().items():
+            metrics[f"reservoir_{name}_size"] = stats["size"]
+            metrics[f"reservoir_{name}_hits"] = stats["hits"]
+            metrics[f"reservoir_{name}_misses"] = stats["misses"]
+            metrics[f"reservoir_{name}_hit_rate"] = stats["hit_rate"]
+        joke_stats = get_joke_stats()
+        metrics["joke_served"] = joke_stats["served"]
+        metrics["joke_fetches_saved"] = joke_stats["fetches_saved"]
+        metrics["joke_repeats"] = joke_stats["repeats"]
+        meme_stats = get_meme_stats()
+        metrics["meme_served"] = meme_stats["served"]
+        metrics["meme_fetches_saved"] = meme_stats["fetches_saved"]
+        metrics["meme_filtered"] = meme_stats["filtered"]
+        metrics["meme_duplicates"] = meme_stats["duplicates"]
+        weather_stats = get_weather_cache_stats()
+        metrics["weather_cache_hits"] = weather_stats["hits"]
+        metrics["weather_cache_misses"] = weather_stats["misses"]
+        metrics["weather_cache_coalesced"] = weather_stats["coalesced"]
+        metrics["weather_cache_size"] = weather_stats["size"]
+        avatar_stats = get_avatar_cache_stats()
+        metrics["avatar_cache_memory_hits"] = avatar_stats["memory_hits"]
+        metrics["avatar_cache_disk_hits"] = avatar_stats["disk_hits"]
+        metrics["avatar_cache_misses"] = avatar_stats["misses"]
+        metrics["avatar_cache_memory_entries"] = avatar_stats["memory_entries"]
+        metrics["avatar_cache_disk_bytes"] = avatar_stats["disk_bytes"]
+        render_stats = get_render_stats()
+        metrics["welcome_render_queue_depth"] = render_stats["queue_depth"]
+        metrics["welcome_render_in_flight"] = render_stats["in_flight"]
+        metrics["welcome_render_rejected"] = render_stats["rejected"]
+        metrics["welcome_render_failed"] = render_stats["failed"]
+        metrics["welcome_render_restarts"] = render_stats["restarts"]
+        for stage, avg_ms in render_stats["stages_avg_ms"].items():
+            metrics[f"welcome_render_{stage}_avg_ms"] = avg_ms
+        for host, stats in get_upstream_stats().items():
+            name = re.sub(r"\W", "_", host.split("://", 1)[-1])
+            metrics[f"upstream_{name}_open"] = int(stats["state"] != "closed")
+            metrics[f"upstream_{name}_rejected"] = stats["rejected"]
+            metrics[f"upstream_{name}_hedges"] = stats["hedges"]
+        for kind, count in get_fallback_stats().items():
+            metrics[f"fallback_{kind}_served"] = count
+
+        self.command_counts.clear()
+        self._lag_sum = lag_sum
+        self._lag_samples = lag_samples
+        return metrics
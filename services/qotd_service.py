@@ -1,34 +1,107 @@
-import requests
+import os
+import json
+import time
+import asyncio
 import logging
+import datetime
+from services.http_client import get_json
+from services.fallback_content import get_fallback
 
 logger = logging.getLogger(__name__)
 
-#Makes the API request.
-def _make_request(url: str) -> list | None:
+# The quote only changes once per UTC day, so it's fetched once, kept in memory and saved here for restarts.
+QOTD_CACHE_PATH = os.getenv('QOTD_CACHE_PATH', 'data/qotd.json')
+# ZenQuotes rate limits hard. After a failed fetch, wait this long before asking again.
+QOTD_RETRY_SECONDS = float(os.getenv('QOTD_RETRY_SECONDS', 60))
+
+_cache = {"day": None, "quote": None, "author": None}
+_disk_checked = False
+_retry_at = 0.0
+# Only one caller fetches at the day rollover, the rest wait for its result.
+_lock = asyncio.Lock()
+
+
+def _format_quote(quote: str, author: str) -> str:
+    return f"> {quote}\n> \n> *- {author}*"
+
+
+def _today() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+def _load_cache_file() -> dict | None:
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        if 'application/json' in response.headers.get('Content-Type', ''):
-            return response.json()
-        else:
-            logger.error(f"Non-JSON response from {url}: {response.headers.get('Content-Type')}")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request failed for {url}: {e}")
+        with open(QOTD_CACHE_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
         return None
 
-def get_qotd() -> str | None:
-    """Fetches the quote of the day from ZenQuotes."""
+
+def _save_cache_file(cache: dict):
+    directory = os.path.dirname(QOTD_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = QOTD_CACHE_PATH + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temp_path, QOTD_CACHE_PATH)
+
+
+async def _fetch_qotd() -> tuple[str, str] | None:
     url = "https://zenquotes.io/api/today"
     logger.debug(f"Requesting QOTD from {url}")
-    data = _make_request(url)
+    data = await get_json(url)
 
     if data and isinstance(data, list) and len(data) > 0 and 'q' in data[0] and 'a' in data[0]:
         quote = data[0]['q']
         author = data[0]['a']
-        formatted_quote = f"> {quote}\n> \n> *- {author}*"
         logger.info(f"Successfully fetched QOTD by {author}")
-        return formatted_quote
+        return quote, author
     else:
         logger.error(f"Failed to fetch or parse QOTD. Data: {data}")
         return None
+
+
+async def get_qotd() -> str | None:
+    """Returns the quote of the day from ZenQuotes, fetching it at most once per UTC day."""
+    global _cache, _disk_checked, _retry_at
+    today = _today()
+    if _cache["day"] == today:
+        return _format_quote(_cache["quote"], _cache["author"])
+
+    async with _lock:
+        # Someone else may have fetched it while we waited for the lock.
+        if _cache["day"] == today:
+            return _format_quote(_cache["quote"], _cache["author"])
+
+        if not _disk_checked:
+            _disk_checked = True
+            try:
+                saved = await asyncio.to_thread(_load_cache_file)
+            except Exception as e:
+                logger.error(f"Failed to read QOTD cache from {QOTD_CACHE_PATH}: {e}", exc_info=True)
+                saved = None
+            if saved and saved.get("quote") and saved.get("author"):
+                _cache = saved
+                if _cache["day"] == today:
+                    logger.info(f"Loaded today's QOTD from {QOTD_CACHE_PATH}")
+                    return _format_quote(_cache["quote"], _cache["author"])
+
+        fetched = await _fetch_qotd() if time.monotonic() >= _retry_at else None
+        if fetched is None:
+            _retry_at = max(_retry_at, time.monotonic() + QOTD_RETRY_SECONDS)
+            # Yesterday's quote beats no quote while ZenQuotes is unavailable.
+            if _cache["quote"]:
+                logger.warning(f"Serving the QOTD from {_cache['day']}, today's couldn't be fetched.")
+                return _format_quote(_cache["quote"], _cache["author"])
+            # Nothing cached at all, so a bundled quote it is. It isn't saved, the real one is fetched once ZenQuotes is back.
+            fallback = get_fallback('quotes')
+            return _format_quote(*fallback) if fallback else None
+
+        quote, author = fetched
+        _cache = {"day": today, "quote": quote, "author": author}
+        try:
+            await asyncio.to_thread(_save_cache_file, _cache)
+        except Exception as e:
+            logger.error(f"Failed to save QOTD cache to {QOTD_CACHE_PATH}: {e}", exc_info=True)
+        return _format_quote(quote, author)
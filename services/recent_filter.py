@@ -0,0 +1,40 @@
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class RecentlyServed:
+    """
+    Remembers the last `per_key` item IDs served to each key (e.g. a guild), to avoid handing out repeats.
+
+    Each key gets a ring buffer plus a set for O(1) lookups, so memory stays at `per_key` IDs per key no
+    matter how long the bot runs. Only the `max_keys` most recently active keys are kept.
+    """
+    def __init__(self, per_key: int, max_keys: int = 1000):
+        self.per_key = max(1, per_key)
+        self.max_keys = max(1, max_keys)
+        self._recent: OrderedDict[object, tuple[deque, set]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def seen(self, key, item_id) -> bool:
+        entry = self._recent.get(key)
+        return entry is not None and item_id in entry[1]
+
+    def add(self, key, item_id):
+        entry = self._recent.get(key)
+        if entry is None:
+            entry = self._recent[key] = (deque(), set())
+            if len(self._recent) > self.max_keys:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(key)
+        ring, ids = entry
+        if item_id in ids:
+            return
+        if len(ring) >= self.per_key:
+            ids.discard(ring.popleft())
+        ring.append(item_id)
+        ids.add(item_id)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render queue is full and the backpressure policy rejects the job."""
+
+
+def _run_job(fn, submitted_at: float, args: tuple) -> tuple[object, dict]:
+    # Runs inside the worker. Wall clock time is used because perf_counter isn't comparable across processes.
+    started_at = time.time()
+    output, timings = fn(*args)
+    timings['queue_wait'] = max(0.0, started_at - submitted_at)
+    return output, timings
+
+
+def _noop():
+    return None
+
+
+class RenderPool:
+    """
+    Runs CPU-heavy image rendering off the event loop in a pool of worker processes or threads.
+
+    Jobs are plain functions that take picklable arguments and return `(output, {stage: seconds})`,
+    where output is usually the encoded image bytes.
+    At most `max_queue` jobs are admitted at once; beyond that, the "reject" policy fails fast with
+    RenderQueueFull and the "wait" policy waits up to `wait_timeout` seconds for a free slot.
+    """
+    def __init__(self, mode: str = "process", workers: int = 2, max_queue: int = 32, backpressure: str = "reject", wait_timeout: float = 10.0, initializer=None):
+        if mode not in ("process", "thread"):
+            logger.warning(f"Unknown render mode '{mode}', falling back to 'process'.")
+            mode = "process"
+        if backpressure not in ("reject", "wait"):
+            logger.warning(f"Unknown render backpressure policy '{backpressure}', falling back to 'reject'.")
+            backpressure = "reject"
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.backpressure = backpressure
+        self.wait_timeout = wait_timeout
+        self.initializer = initializer
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._stage_totals: dict[str, float] = {}
+        self._stage_max: dict[str, float] = {}
+
+    def start(self):
+        #Creates the executor and spins up every worker, so their initializer runs before the first job.
+        if self._executor is not None:
+            return
+        if self.mode == "process":
+            # Not fork: the bot already runs threads by now, and a forked child can inherit a lock one of them held.
+            # The initializer loads everything a worker needs, so nothing has to be inherited.
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer, mp_context=context)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render", initializer=self.initializer)
+        if self._slots is None:
+            # Kept across pool restarts, since jobs still finishing on the old pool hold slots of it.
+            self._slots = asyncio.Semaphore(self.max_queue)
+        for _ in range(self.workers):
+            self._executor.submit(_noop)
+        logger.info(f"Render pool started ({self.mode}, workers={self.workers}, queue={self.max_queue}, backpressure={self.backpressure}).")
+
+    async def submit(self, fn, *args):
+        """
+        Renders a job in the pool and returns its output.
+
+        Raises:
+            RenderQueueFull: If the queue is full and the job could not be admitted.
+        """
+        self.start()
+        if self.backpressure == "reject" and self._slots.locked():
+            self.rejected += 1
+            raise RenderQueueFull(f"Render queue is full ({self.max_queue} jobs).")
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise RenderQueueFull(f"Timed out after {self.wait_timeout}s waiting for a render slot.")
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            output, timings = await loop.run_in_executor(executor, _run_job, fn, time.time(), args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for running out of memory) and took the pool with it. Drop it so the
+            # next job starts a fresh one, unless a job that failed alongside this one already did.
+            self.failed += 1
+            if self._executor is executor:
+                logger.error("Render worker died, restarting the render pool.")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        timings['total'] = time.perf_counter() - started
+        self._record(timings)
+        self.completed += 1
+        return output
+
+    def _record(self, timings: dict):
+        for stage, seconds in timings.items():
+            self._stage_totals[stage] = self._stage_totals.get(stage, 0.0) + seconds
+            self._stage_max[stage] = max(self._stage_max.get(stage, 0.0), seconds)
+
+    def stats(self) -> dict:
+        """Returns queue depth, counters and per-stage average/max timings in milliseconds."""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "stages_avg_ms": {stage: round(total / self.completed * 1000, 2) for stage, total in self._stage_totals.items()} if self.completed else {},
+            "stages_max_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self._stage_max.items()},
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info(f"Render pool shut down. Stats: {self.stats()}")
@@ -0,0 +1,182 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# After a refill fails, don't try again for this long. A live fetch on a miss still goes through.
+REFILL_RETRY_SECONDS = float(os.getenv('RESERVOIR_RETRY_SECONDS', 30))
+
+
+class Reservoir:
+    """
+    Keeps a few pre-fetched items from a random-content API ready, so commands don't wait on the upstream.
+
+    `fetch_batch` is an async callable returning a list of fresh items (empty on failure). Items are handed
+    out oldest first by `get`. When the count drops below `low_water` a background task fetches batches until
+    the reservoir is back at `capacity`. If it's empty, `get` falls back to a live fetch.
+
+    Args:
+        name (str): Name used in logs and metrics.
+        fetch_batch (Callable): Async callable returning a list of items.
+        capacity (int): How many items to keep ready. 0 disables prefetching, every get is a live fetch.
+        low_water (int): Refill once fewer than this many items are left.
+    """
+    def __init__(self, name: str, fetch_batch: Callable[[], Awaitable[list]], capacity: int, low_water: int):
+        self.name = name
+        self.fetch_batch = fetch_batch
+        self.capacity = max(0, capacity)
+        self.low_water = max(0, min(low_water, self.capacity))
+        self._items: deque = deque()
+        self._refill_task: asyncio.Task | None = None
+        self._retry_at = 0.0
+        self._running = False
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.failures = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def start(self):
+        #Fills the reservoir in the background. Must be called from a running event loop.
+        self._running = True
+        self._maybe_refill(force=True)
+
+    def stop(self):
+        self._running = False
+        if self._refill_task:
+            self._refill_task.cancel()
+            self._refill_task = None
+
+    async def get(self, accept: Callable[[Any], bool] = None) -> Any | None:
+        """
+        Returns a pre-fetched item, or fetches one live if none are ready.
+
+        Args:
+            accept (Callable, optional): Only hand out pre-fetched items this returns True for, skipped ones stay in
+                                         the reservoir. On a live fetch an accepted item is preferred, but any item beats none.
+
+        Returns:
+            The item, or None if the live fetch failed too.
+        """
+        item = self._take(accept)
+        if item is not None:
+            self.hits += 1
+            self._maybe_refill()
+            return item
+
+        self.misses += 1
+        logger.debug(f"Reservoir '{self.name}' miss, fetching live.")
+        items = await self._fetch()
+        self._maybe_refill()
+        if not items:
+            return None
+        index = next((i for i, item in enumerate(items) if accept(item)), 0) if accept is not None else 0
+        item = items.pop(index)
+        # Keep the rest of the batch for the next callers.
+        self._store(items)
+        return item
+
+    def _take(self, accept: Callable[[Any], bool] | None) -> Any | None:
+        if accept is None:
+            return self._items.popleft() if self._items else None
+        for index, item in enumerate(self._items):
+            if accept(item):
+                del self._items[index]
+                return item
+        return None
+
+    def _store(self, items: list):
+        room = self.capacity - len(self._items)
+        if room > 0:
+            self._items.extend(items[:room])
+
+    async def _fetch(self) -> list:
+        self.fetches += 1
+        try:
+            items = await self.fetch_batch()
+        except Exception as e:
+            logger.error(f"Reservoir '{self.name}' fetch failed: {e}", exc_info=True)
+            items = None
+        if not items:
+            self.failures += 1
+            return []
+        return list(items)
+
+    def _maybe_refill(self, force: bool = False):
+        if not self._running or not self.capacity:
+            return
+        if self._refill_task and not self._refill_task.done():
+            return
+        if not force and len(self._items) >= self.low_water:
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        self._refill_task = asyncio.create_task(self._refill(), name=f"reservoir-{self.name}")
+
+    async def _refill(self):
+        while len(self._items) < self.capacity:
+            items = await self._fetch()
+            if not items:
+                self._retry_at = time.monotonic() + REFILL_RETRY_SECONDS
+                logger.warning(f"Reservoir '{self.name}' refill failed with {len(self._items)}/{self.capacity} item(s) ready. Retrying in {REFILL_RETRY_SECONDS}s at the earliest.")
+                return
+            self._store(items)
+        logger.debug(f"Reservoir '{self.name}' refilled to {len(self._items)} item(s).")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "fetches": self.fetches,
+            "failures": self.failures,
+        }
+
+
+_reservoirs: dict[str, Reservoir] = {}
+
+
+def create_reservoir(name: str, fetch_batch: Callable[[], Awaitable[list]], default_size: int, default_low: int) -> Reservoir:
+    """
+    Creates and registers a reservoir, sized from RESERVOIR_<NAME>_SIZE and RESERVOIR_<NAME>_LOW if set.
+    """
+    prefix = f"RESERVOIR_{name.upper()}"
+    reservoir = Reservoir(
+        name,
+        fetch_batch,
+        capacity=int(os.getenv(f"{prefix}_SIZE", default_size)),
+        low_water=int(os.getenv(f"{prefix}_LOW", default_low)),
+    )
+    _reservoirs[name] = reservoir
+    return reservoir
+
+
+def single_item(fetch_one: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[list]]:
+    #Adapts an API that returns one item per request into a batch fetch.
+    async def fetch_batch() -> list:
+        item = await fetch_one()
+        return [item] if item is not None else []
+    return fetch_batch
+
+
+def start_reservoirs():
+    for reservoir in _reservoirs.values():
+        reservoir.start()
+
+
+def stop_reservoirs():
+    for reservoir in _reservoirs.values():
+        reservoir.stop()
+
+
+def get_reservoir_stats() -> dict[str, dict]:
+    return {name: reservoir.stats() for name, reservoir in _reservoirs.items()}
@@ -1,10 +1,16 @@
 import os
-import requests
+import random
+import asyncio
+import logging
+from collections import deque
+from services.http_client import post_json
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 API_URL = "https://theslow.net/api/slowstats/ingest-events"
 API_KEY = os.getenv("SLOWSTATS_COMMANDER_API_KEY")
 PROJECT_ID = os.getenv("SLOWSTATS_COMMANDER_PROJECT_ID")
@@ -15,6 +21,152 @@ if not API_KEY:
 if not PROJECT_ID:
     raise EnvironmentError("Missing SLOWSTATS_PROJECT_ID in .env.")
 
+# Queue tuning. Events are buffered in memory and posted in batches by a background task.
+EVENT_QUEUE_SIZE = int(os.getenv("SLOWSTATS_EVENT_QUEUE_SIZE", 1000))
+EVENT_BATCH_SIZE = int(os.getenv("SLOWSTATS_EVENT_BATCH_SIZE", 25))
+EVENT_FLUSH_INTERVAL = float(os.getenv("SLOWSTATS_EVENT_FLUSH_INTERVAL", 5))
+EVENT_OVERFLOW_POLICY = os.getenv("SLOWSTATS_EVENT_OVERFLOW", "drop_oldest") # "drop_oldest" or "sample"
+
+
+class EventQueue:
+    """
+    Bounded in-memory queue that drains telemetry events to SlowStats in batches.
+
+    When the queue is full the overflow policy decides what happens to a new event:
+    "drop_oldest" evicts the oldest queued event, "sample" keeps a uniform random
+    sample of everything offered since the last flush (reservoir sampling).
+    """
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float, overflow_policy: str):
+        if overflow_policy not in ("drop_oldest", "sample"):
+            logger.warning(f"Unknown event overflow policy '{overflow_policy}', falling back to 'drop_oldest'.")
+            overflow_policy = "drop_oldest"
+        self.max_size = max(1, max_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self._events: deque = deque()
+        self._offered_since_full = 0
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+
+    def put(self, event: dict):
+        #Adds an event without waiting. Never raises and never touches the network.
+        self.enqueued += 1
+        if len(self._events) < self.max_size:
+            self._events.append(event)
+        elif self.overflow_policy == "drop_oldest":
+            self._events.popleft()
+            self._events.append(event)
+            self.dropped += 1
+        else:
+            self._offered_since_full += 1
+            slot = random.randrange(self.max_size + self._offered_since_full)
+            if slot < self.max_size:
+                self._events[slot] = event
+            self.dropped += 1
+
+        if self._wakeup and len(self._events) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        #Starts the background drain task. Must be called from a running event loop.
+        if self._task and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="slowstats-event-queue")
+        logger.info(f"Event queue started (size={self.max_size}, batch={self.batch_size}, interval={self.flush_interval}s, overflow={self.overflow_policy}).")
+
+    async def stop(self):
+        #Stops the drain task and flushes whatever is still queued.
+        if self._task:
+            # Let the drain task finish the batch it may be sending rather than cancelling it mid-request,
+            # which would lose that batch without counting it anywhere.
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._events:
+            # Last chance is gone, so whatever SlowStats wouldn't take now is lost.
+            self.failed += len(self._events)
+            self._events.clear()
+        logger.info(f"Event queue stopped. Stats: {self.stats()}")
+
+    async def flush(self):
+        #Sends every queued event, one batch at a time. Stops at the first failed batch, which goes back in the queue.
+        while self._events:
+            batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            self._offered_since_full = 0
+            if not await self._send_batch(batch):
+                return
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Unexpected error while flushing event queue: {e}", exc_info=True)
+
+    async def _send_batch(self, batch: list[dict]) -> bool:
+        # ingest-events takes one event object per request, so a batch is only how many get sent per wakeup.
+        headers = {
+            "Content-Type": "application/json",
+            "x-api-key": API_KEY
+        }
+        for index, event in enumerate(batch):
+            if not await post_json(API_URL, event, headers=headers, timeout=5):
+                # SlowStats is most likely down, so don't keep hammering it with the rest of the batch.
+                self._requeue(batch[index:])
+                return False
+            self.sent += 1
+        logger.debug(f"Sent {len(batch)} event(s) to SlowStats.")
+        return True
+
+    def _requeue(self, events: list[dict]):
+        #Puts unsent events back at the front of the queue, as far as there is room. Whatever doesn't fit is lost.
+        room = max(0, self.max_size - len(self._events))
+        kept = events[:room]
+        self._events.extendleft(reversed(kept))
+        self.failed += len(events) - len(kept)
+        logger.warning(f"Failed to send {len(events)} event(s) to SlowStats, requeued {len(kept)}.")
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._events),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+
+_queue = EventQueue(EVENT_QUEUE_SIZE, EVENT_BATCH_SIZE, EVENT_FLUSH_INTERVAL, EVENT_OVERFLOW_POLICY)
+
+
+def start_event_queue():
+    _queue.start()
+
+
+async def stop_event_queue():
+    await _queue.stop()
+
+
+def get_event_queue_stats() -> dict:
+    """Returns the current depth and counters of the event queue."""
+    return _queue.stats()
+
+
 def send_event(
     event_type: str,
     description: str = None,
@@ -23,6 +175,10 @@ def send_event(
     webhook_title: str = None,
     webhook_description: str = None,
 ):
+    """
+    Queues an event for SlowStats. This is fire-and-forget: the event is sent in the next batch
+    by the background queue, so callers never wait on the network.
+    """
     if not event_type:
         raise ValueError("event_type is required.")
 
@@ -48,19 +204,7 @@ def send_event(
             discord_webhook["description"] = _sanitize_discord_text(webhook_description)
         data["discordWebhook"] = discord_webhook
 
-    # Prepare headers
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": API_KEY
-    }
-
-    # Send request
-    try:
-        response = requests.post(API_URL, json=data, headers=headers, timeout=5)
-        response.raise_for_status()
-        print("✅ Event sent successfully.")
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Failed to send event: {e}")
+    _queue.put(data)
 
 def _sanitize_discord_text(text: str) -> str:
     """Redacts mentions and basic PII from webhook titles/descriptions."""
@@ -1,11 +1,14 @@
 # send_metrics.py
 
 import os
-import requests
+import logging
+from services.http_client import post_json
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 API_URL = "https://theslow.net/api/slowstats/ingest-metrics"
 API_KEY = os.getenv("SLOWSTATS_COMMANDER_API_KEY")
 PROJECT_ID = os.getenv("SLOWSTATS_COMMANDER_PROJECT_ID")
@@ -15,7 +18,7 @@ if not API_KEY:
 if not PROJECT_ID:
     raise EnvironmentError("Missing SLOWSTATS_COMMANDER_PROJECT_ID in .env.")
 
-def send_metrics(metrics: dict):
+async def send_metrics(metrics: dict):
     """
     Sends a batch of metrics to SlowStats using the /ingest-metrics endpoint.
     Each key in `metrics` is a metric name and its value is a number.
@@ -33,9 +36,7 @@ def send_metrics(metrics: dict):
         "X-API-KEY": API_KEY
     }
 
-    try:
-        response = requests.post(API_URL, json=payload, headers=headers, timeout=5)
-        response.raise_for_status()
-        print(f"✅ Sent metrics: {list(metrics.keys())}")
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Failed to send metrics: {e}")
+    if await post_json(API_URL, payload, headers=headers, timeout=5):
+        logger.debug(f"Sent metrics: {list(metrics.keys())}")
+    else:
+        logger.warning(f"Failed to send metrics: {list(metrics.keys())}")
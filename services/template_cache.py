@@ -0,0 +1,87 @@
+import os
+import logging
+import threading
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def scan_templates(directory: str) -> tuple:
+    """
+    Returns a cheap signature of the template files in a directory: a sorted tuple of (name, mtime_ns, size).
+    Any file being added, removed or replaced changes the signature.
+    """
+    try:
+        entries = [
+            (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+            for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.lower().endswith(TEMPLATE_EXTENSIONS)
+        ]
+    except OSError as e:
+        logger.error(f"Could not scan template directory '{directory}': {e}")
+        return ()
+    return tuple(sorted(entries))
+
+
+class TemplateCache:
+    """
+    Holds background images decoded once and normalized to one canonical size.
+
+    Templates that would push the cache over `budget_bytes` are not kept in memory; they are
+    decoded from disk on every use instead, so a large directory degrades to the old behaviour
+    rather than eating memory.
+    """
+    def __init__(self, directory: str, size: tuple[int, int], budget_bytes: int):
+        self.directory = directory
+        self.size = size
+        self.budget_bytes = budget_bytes
+        self.signature: tuple = ()
+        self.used_bytes = 0
+        self._images: dict[str, Image.Image] = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> list[str]:
+        return [name for name, _, _ in self.signature]
+
+    def _decode(self, name: str) -> Image.Image:
+        with Image.open(os.path.join(self.directory, name)) as image:
+            # Crop to the canonical aspect ratio and scale, so every template has the same layout.
+            return ImageOps.fit(image.convert("RGBA"), self.size, method=Image.LANCZOS)
+
+    def load(self, signature: tuple = None):
+        #(Re)decodes every template in the directory. Passing the signature avoids scanning twice.
+        signature = signature if signature is not None else scan_templates(self.directory)
+        images = {}
+        used_bytes = 0
+        for name, _, _ in signature:
+            image_bytes = self.size[0] * self.size[1] * 4
+            if used_bytes + image_bytes > self.budget_bytes:
+                logger.warning(f"Template '{name}' does not fit in the cache budget ({self.budget_bytes // (1024 * 1024)} MB), it will be decoded on use.")
+                continue
+            try:
+                images[name] = self._decode(name)
+                used_bytes += image_bytes
+            except Exception as e:
+                logger.error(f"Failed to decode template '{name}': {e}", exc_info=True)
+        self._images = images
+        self.used_bytes = used_bytes
+        self.signature = signature
+        logger.info(f"Loaded {len(images)} template(s) from '{self.directory}' ({used_bytes // 1024} KB).")
+
+    def ensure(self, signature: tuple):
+        #Reloads if the caller has seen a different directory state than the one we decoded.
+        if signature == self.signature:
+            return
+        with self._lock:
+            if signature != self.signature:
+                self.load(signature)
+
+    def get(self, name: str) -> Image.Image:
+        """Returns a template image. The cached image is shared and must be copied before drawing on it."""
+        image = self._images.get(name)
+        if image is None:
+            return self._decode(name)
+        return image
@@ -0,0 +1,76 @@
+import os
+import re
+import logging
+from difflib import SequenceMatcher
+
+logger = logging.getLogger(__name__)
+
+# Words, runs of whitespace and single punctuation marks, so a diff marks whole words instead of scattered letters.
+_TOKEN_RE = re.compile(r'\w+|\s+|[^\w\s]')
+
+
+def inline_diff(before: str, after: str, context: int = 40, limit: int = 1000, max_matcher_chars: int = 4000) -> str:
+    """
+    Renders the difference between two versions of a message as one line of text, showing only the
+    changed spans with a little context around them. Removed text is shown as [-text-], added text as {+text+}.
+
+    The common prefix and suffix are stripped first, which is all that's needed for the usual small edit.
+    If what's left is longer than `max_matcher_chars` it's shown as a single replacement instead of running
+    a full word diff over it.
+
+    Args:
+        before (str): The original text.
+        after (str): The edited text.
+        context (int): Characters of unchanged text kept on each side of a change.
+        limit (int): Maximum length of the result, longer output is cut off with "...".
+        max_matcher_chars (int): Largest changed region that gets a word-level diff.
+
+    Returns:
+        str: The rendered diff.
+    """
+    prefix = len(os.path.commonprefix([before, after]))
+    max_suffix = min(len(before), len(after)) - prefix
+    suffix = len(os.path.commonprefix([before[prefix:][::-1], after[prefix:][::-1]])) if max_suffix > 0 else 0
+    suffix = min(suffix, max_suffix)
+
+    old_middle = before[prefix:len(before) - suffix]
+    new_middle = after[prefix:len(after) - suffix]
+
+    parts = []
+    if prefix:
+        parts.append(_tail(before[:prefix], context))
+
+    if len(old_middle) + len(new_middle) > max_matcher_chars:
+        parts.append(_change(old_middle, new_middle))
+    else:
+        old_tokens = _TOKEN_RE.findall(old_middle)
+        new_tokens = _TOKEN_RE.findall(new_middle)
+        matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                parts.append(_elide("".join(old_tokens[i1:i2]), context))
+            else:
+                parts.append(_change("".join(old_tokens[i1:i2]), "".join(new_tokens[j1:j2])))
+
+    if suffix:
+        parts.append(_head(after[len(after) - suffix:], context))
+
+    result = "".join(parts)
+    return result[:limit - 3] + "..." if len(result) > limit else result
+
+
+def _change(removed: str, added: str) -> str:
+    return (f"[-{removed}-]" if removed else "") + (f"{{+{added}+}}" if added else "")
+
+
+def _head(text: str, context: int) -> str:
+    return text if len(text) <= context else text[:context] + "…"
+
+
+def _tail(text: str, context: int) -> str:
+    return text if len(text) <= context else "…" + text[-context:]
+
+
+def _elide(text: str, context: int) -> str:
+    # Unchanged text between two changes, shortened to a bit of context on each side.
+    return text if len(text) <= 2 * context else text[:context] + " … " + text[-context:]
@@ -0,0 +1,146 @@
+import os
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures (timeouts, connection errors, 5xx and 429s) before a host's breaker opens.
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 3))
+# How long an open breaker fails fast before letting one probe request through. Doubles after each failed probe.
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 30))
+BREAKER_MAX_COOLDOWN = float(os.getenv('BREAKER_MAX_COOLDOWN', 300))
+# Hedged requests never fire sooner than this, however fast the host usually is.
+HEDGE_MIN_DELAY = float(os.getenv('HTTP_HEDGE_MIN_DELAY', 0.25))
+# Latency samples kept per host, and how many are needed before its p95 is trusted for hedging.
+LATENCY_WINDOW = 100
+HEDGE_MIN_SAMPLES = 20
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class HostHealth:
+    """
+    Circuit breaker and latency tracker for one upstream host.
+
+    Closed: requests go through, consecutive failures are counted. Open: requests fail fast until the
+    cooldown is over. Half-open: exactly one probe request goes through, its outcome closes the breaker
+    again or reopens it with a longer cooldown.
+    """
+    def __init__(self, host: str):
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._p95: float | None = None
+        self.requests = 0
+        self.rejected = 0
+        self.trips = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        #Whether a request may go to the host right now. Moves an open breaker to half-open once its cooldown is over.
+        if self.state == OPEN and self.retry_in() == 0:
+            self.state = HALF_OPEN
+            logger.info(f"Circuit breaker for {self.host} is half-open, sending a probe request.")
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+        elif self.state == OPEN:
+            self.rejected += 1
+            return False
+        self.requests += 1
+        return True
+
+    def record(self, ok: bool | None, latency: float):
+        """
+        Records the outcome of a request that `allow` let through.
+
+        Args:
+            ok (bool | None): True if the host answered properly, False if it failed, None if the caller
+                              gave up (e.g. was cancelled) before there was an outcome.
+            latency (float): Seconds the request took.
+        """
+        probe = self._probe_in_flight
+        self._probe_in_flight = False
+        if ok is None:
+            # A cancelled probe says nothing about the host. Open again so the next request can probe.
+            if probe and self.state == HALF_OPEN:
+                self.state = OPEN
+            return
+
+        if ok:
+            self._latencies.append(latency)
+            self._p95 = None
+            if self.state != CLOSED:
+                logger.info(f"Circuit breaker for {self.host} closed, the host is answering again.")
+            self.state = CLOSED
+            self.failures = 0
+            self.cooldown = BREAKER_COOLDOWN
+            return
+
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+            self._trip()
+        elif self.state == CLOSED and self.failures >= BREAKER_FAILURES:
+            self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        logger.warning(f"Circuit breaker for {self.host} opened after {self.failures} failure(s). Failing fast for {self.cooldown:.0f}s.")
+
+    @property
+    def p95(self) -> float | None:
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        if self._p95 is None:
+            ordered = sorted(self._latencies)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+        return self._p95
+
+    def hedge_delay(self) -> float | None:
+        #Seconds to wait before sending a second copy of a request, or None if the host isn't known well enough to hedge.
+        if self.state != CLOSED:
+            return None
+        p95 = self.p95
+        return max(p95, HEDGE_MIN_DELAY) if p95 is not None else None
+
+    def stats(self) -> dict:
+        p95 = self.p95
+        return {
+            "state": self.state,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "trips": self.trips,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+        }
+
+
+_hosts: dict[str, HostHealth] = {}
+
+
+def health_for(host: str) -> HostHealth:
+    health = _hosts.get(host)
+    if health is None:
+        health = _hosts[host] = HostHealth(host)
+    return health
+
+
+def get_upstream_stats() -> dict[str, dict]:
+    return {host: health.stats() for host, health in _hosts.items()}
@@ -0,0 +1,122 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Longest channel path kept per session, a member hopping around all evening doesn't need every hop listed.
+MAX_PATH_LENGTH = 25
+
+
+class VoiceSession:
+    """
+    One member's time in voice, from joining until they leave for longer than the reconnect grace.
+    `started_at` is a unix timestamp, or None when the member was already connected before the bot started.
+    """
+    __slots__ = ('guild_id', 'member_id', 'member_name', 'avatar_url', 'started_at', 'path', 'reconnects', 'connected_seconds', '_segment_start', 'left_at')
+
+    def __init__(self, guild_id: int, member_id: int, member_name: str, avatar_url: str, channel_name: str, started_at: float | None, now: float):
+        self.guild_id = guild_id
+        self.member_id = member_id
+        self.member_name = member_name
+        self.avatar_url = avatar_url
+        self.started_at = started_at
+        self.path = [channel_name]
+        self.reconnects = 0
+        self.connected_seconds = 0.0
+        self._segment_start = now
+        self.left_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.left_at is None
+
+    def _visit(self, channel_name: str):
+        if self.path[-1] == channel_name:
+            return
+        if len(self.path) < MAX_PATH_LENGTH:
+            self.path.append(channel_name)
+        elif self.path[-2] != "…":
+            # Full: the first channels, one "…" for everything skipped, then wherever they are now.
+            self.path[-2:] = ["…", channel_name]
+        else:
+            self.path[-1] = channel_name
+
+    def _close_segment(self, now: float):
+        self.connected_seconds += now - self._segment_start
+        self.left_at = now
+
+
+class VoiceSessionTracker:
+    """
+    Per-member voice sessions, keyed by (guild ID, member ID).
+
+    Joins, moves and leaves update the member's session instead of being logged one by one. A leave only
+    ends the session once the member has stayed out for `reconnect_grace` seconds, so a member dropping
+    and coming back on a bad connection stays in the same session. The caller is expected to call
+    `finish` after the grace period and log what it returns.
+    """
+    def __init__(self, reconnect_grace: float):
+        self.reconnect_grace = reconnect_grace
+        self._sessions: dict[tuple[int, int], VoiceSession] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def join(self, guild_id: int, member_id: int, member_name: str, avatar_url: str, channel_name: str, now: float = None):
+        """Records a member connecting to a channel. Returns True if it resumed a session within the grace period."""
+        now = time.monotonic() if now is None else now
+        session = self._sessions.get((guild_id, member_id))
+        if session is not None and not session.is_open:
+            session.left_at = None
+            session._segment_start = now
+            session.reconnects += 1
+            session._visit(channel_name)
+            return True
+        if session is None:
+            self._sessions[(guild_id, member_id)] = VoiceSession(guild_id, member_id, member_name, avatar_url, channel_name, time.time(), now)
+        else:
+            # Already open, e.g. a missed leave. Treat it as a move.
+            session._visit(channel_name)
+        return False
+
+    def move(self, guild_id: int, member_id: int, member_name: str, avatar_url: str, from_channel: str, to_channel: str, now: float = None):
+        """Records a member switching channels."""
+        now = time.monotonic() if now is None else now
+        session = self._sessions.get((guild_id, member_id))
+        if session is None:
+            # Connected before the bot started, so the start of the session is unknown.
+            session = self._sessions[(guild_id, member_id)] = VoiceSession(guild_id, member_id, member_name, avatar_url, from_channel, None, now)
+        session._visit(to_channel)
+
+    def leave(self, guild_id: int, member_id: int, member_name: str, avatar_url: str, channel_name: str, now: float = None) -> VoiceSession:
+        """Records a member disconnecting. The session stays around until `finish` is called."""
+        now = time.monotonic() if now is None else now
+        session = self._sessions.get((guild_id, member_id))
+        if session is None:
+            session = self._sessions[(guild_id, member_id)] = VoiceSession(guild_id, member_id, member_name, avatar_url, channel_name, None, now)
+        if session.is_open:
+            session._close_segment(now)
+        return session
+
+    def finish(self, guild_id: int, member_id: int) -> VoiceSession | None:
+        """Ends a session if the member is still disconnected, and returns it. Returns None if they came back."""
+        session = self._sessions.get((guild_id, member_id))
+        if session is None or session.is_open:
+            return None
+        return self._sessions.pop((guild_id, member_id))
+
+    def close_all(self, now: float = None) -> list[tuple[VoiceSession, bool]]:
+        """
+        Ends every session, including ones still connected, so none go unlogged on shutdown.
+        Returns (session, was still connected) pairs.
+        """
+        now = time.monotonic() if now is None else now
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        closed = []
+        for session in sessions:
+            still_connected = session.is_open
+            if still_connected:
+                session._close_segment(now)
+            closed.append((session, still_connected))
+        return closed
@@ -1,9 +1,122 @@
+import os
+import re
+import time
 import discord
-import requests
+import aiohttp
+import asyncio
 import logging 
+from collections import OrderedDict
+from services.http_client import request_json
+from services.city_index import city_index
 logger = logging.getLogger(__name__) 
 
-def get_weather_embed(city: str, api_key: str) -> discord.Embed | None:
+# OpenWeatherMap updates current weather roughly every 10 minutes, so there's no point asking more often than that.
+WEATHER_CACHE_TTL = float(os.getenv('WEATHER_CACHE_TTL', 600))
+# Typos are remembered for a short while so they don't keep costing API quota.
+WEATHER_NEGATIVE_TTL = float(os.getenv('WEATHER_NEGATIVE_TTL', 60))
+WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', 512))
+
+BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+# Stored in the cache for cities OpenWeatherMap doesn't know, so it can't be mixed up with a None from a bad response.
+_NOT_FOUND = object()
+
+# Normalized query -> (expires at, weather data or _NOT_FOUND), least recently used first.
+_cache: OrderedDict[str, tuple[float, object]] = OrderedDict()
+# Normalized query -> the fetch in progress, shared by everyone asking for the same city at once.
+_inflight: dict[str, asyncio.Task] = {}
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+
+def _normalize_city(city: str) -> str:
+    # "  London , UK" and "london,uk" are the same request.
+    return ",".join(re.sub(r"\s+", " ", part).strip() for part in city.lower().split(","))
+
+
+def _is_valid(data) -> bool:
+    return isinstance(data, dict) and 'main' in data and 'sys' in data and 'name' in data
+
+
+def _store(key: str, data, ttl: float):
+    _cache[key] = (time.monotonic() + ttl, data)
+    _cache.move_to_end(key)
+    while len(_cache) > WEATHER_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+async def _fetch_weather_data(key: str, city: str, api_key: str, city_id: int = None):
+    params = {
+        'appid': api_key,
+        'units': 'metric' # We aren't from the states, so we're celsius first. fahrenheit never... or in this case fahrenheit last. 
+    }
+    # City IDs are unambiguous, names are OpenWeatherMap's best guess.
+    if city_id is not None:
+        params['id'] = city_id
+    else:
+        params['q'] = city
+    logger.info(f"Requesting weather for '{city}' from OpenWeatherMap...")
+    try:
+        # Never hedged, every call counts against the API key's quota.
+        data = await request_json('GET', BASE_URL, params=params, hedge=False)
+    except aiohttp.ClientResponseError as http_err:
+        if http_err.status == 404:
+            _store(key, _NOT_FOUND, WEATHER_NEGATIVE_TTL)
+        raise
+    # Malformed responses aren't cached, the next request gets a fresh try.
+    if _is_valid(data):
+        _store(key, data, WEATHER_CACHE_TTL)
+    return data
+
+
+async def get_weather_data(city: str, api_key: str):
+    """
+    Returns OpenWeatherMap's current weather for a city, from the cache when it's fresh enough.
+
+    Cities known to the offline city index are requested and cached by their OpenWeatherMap ID, so
+    'London', 'london,gb' and the autocomplete choice all share one cache entry. Concurrent requests
+    for the same city share one API call. Errors other than "city not found" are raised as they come
+    from the HTTP client and aren't cached.
+
+    Args:
+        city (str): The requested city, e.g. 'London', 'London,UK' or an autocomplete value like 'id:2643743'.
+        api_key (str): The OpenWeatherMap API key.
+
+    Returns:
+        The API's response (None if it wasn't JSON), or _NOT_FOUND if the city is cached as not found.
+
+    Raises:
+        aiohttp.ClientResponseError: For 404s the first time, and for any other HTTP error.
+    """
+    city_id = city_index.resolve(city)
+    key = f"id:{city_id}" if city_id is not None else _normalize_city(city)
+    entry = _cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        _stats["hits"] += 1
+        _cache.move_to_end(key)
+        return entry[1]
+
+    _stats["misses"] += 1
+    task = _inflight.get(key)
+    if task is not None:
+        _stats["coalesced"] += 1
+    else:
+        task = asyncio.create_task(_fetch_weather_data(key, city, api_key, city_id), name=f"weather-{key}")
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller giving up doesn't cancel the fetch for everyone else.
+    return await asyncio.shield(task)
+
+
+def get_weather_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "size": len(_cache),
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+    }
+
+
+async def get_weather_embed(city: str, api_key: str) -> discord.Embed | None:
     """
     Fetches weather data for a city from OpenWeatherMap and formats it into a Discord Embed.
 
@@ -23,22 +136,14 @@ def get_weather_embed(city: str, api_key: str) -> discord.Embed | None:
                              description="The Weather API key is not configured. Please contact the bot owner.", 
                              color=discord.Color.red())
 
-    base_url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {
-        'q': city,
-        'appid': api_key,
-        'units': 'metric' # We aren't from the states, so we're celsius first. fahrenheit never... or in this case fahrenheit last. 
-    }
-    
-    logger.info(f"Requesting weather for '{city}' from OpenWeatherMap...")
-
     try:
-        response = requests.get(base_url, params=params, timeout=10) 
-        response.raise_for_status() 
-        data = response.json()
+        data = await get_weather_data(city, api_key)
+        if data is _NOT_FOUND:
+            logger.debug(f"City '{city}' is cached as not found.")
+            return _city_not_found_embed(city)
 
         # My web dev professor told me data validation is important, so that's what i am doing
-        if 'main' not in data or 'sys' not in data or 'name' not in data:
+        if not _is_valid(data):
             logger.error(f"Unexpected API response format for city '{city}'. Data: {data}")
             return discord.Embed(title="API Error", 
                                  description="Well, this is awkward! I received unexpected data from the weather service. Please contact the bot owner!", 
@@ -92,29 +197,27 @@ def get_weather_embed(city: str, api_key: str) -> discord.Embed | None:
         return embed
     
 # I expect errors from this, so we logging them...
-    except requests.exceptions.HTTPError as http_err:
+    except aiohttp.ClientResponseError as http_err:
         
-        if response.status_code == 404:
+        if http_err.status == 404:
             logger.warning(f"City '{city}' not found by OpenWeatherMap API. {http_err}") 
-            return discord.Embed(title="City Not Found", 
-                                 description=f"Well, this is awkward! Could not find weather data for the city: `{city}`.\nPlease check the spelling and format (e.g., 'London' or 'London,UK').", 
-                                 color=discord.Color.red())
-        elif response.status_code == 401:
+            return _city_not_found_embed(city)
+        elif http_err.status == 401:
              logger.error(f"Invalid API key or unauthorized access to OpenWeatherMap. {http_err}")
              return discord.Embed(title="API Authentication Error", 
                                   description="Well, this is awkward! There's an issue with the weather service API key. Please contact the bot owner!", 
                                   color=discord.Color.red())
         else:
-            logger.error(f"HTTP error occurred calling OpenWeatherMap for '{city}': {http_err} - Status Code: {response.status_code}", exc_info=True)
+            logger.error(f"HTTP error occurred calling OpenWeatherMap for '{city}': {http_err} - Status Code: {http_err.status}", exc_info=True)
             return discord.Embed(title="Weather Service Error", 
                                  description="Well, this is awkward! The weather service returned an error. Please contact the bot owner!", 
                                  color=discord.Color.orange())
             
-    except requests.exceptions.Timeout as timeout_err:
+    except asyncio.TimeoutError as timeout_err:
         logger.error(f"Request timeout occurred calling OpenWeatherMap for '{city}': {timeout_err}")
         return None
 
-    except requests.exceptions.RequestException as req_err:
+    except aiohttp.ClientError as req_err:
         logger.error(f"Request error occurred calling OpenWeatherMap for '{city}': {req_err}", exc_info=True)
         return None
         
@@ -122,3 +225,13 @@ def get_weather_embed(city: str, api_key: str) -> discord.Embed | None:
         logger.error(f"An unexpected error occurred in get_weather_embed for city '{city}': {e}", exc_info=True)
         return None
 
+
+
+def _city_not_found_embed(city: str) -> discord.Embed:
+    # Show the city's name rather than an autocomplete value like 'id:2643743'.
+    city_id = city_index.resolve(city)
+    if city_id is not None and city_id in city_index:
+        city = city_index.label(city_id)
+    return discord.Embed(title="City Not Found", 
+                         description=f"Well, this is awkward! Could not find weather data for the city: `{city}`.\nPlease check the spelling and format (e.g., 'London' or 'London,UK').", 
+                         color=discord.Color.red())
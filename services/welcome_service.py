@@ -2,9 +2,17 @@ import discord
 from discord import File
 import random
 import os
+import io
+import time
+import asyncio
 import logging
 
-from easy_pil import Editor, load_image_async, Font 
+from easy_pil import Editor, Font 
+from services.http_client import get_bytes
+from services.render_pool import RenderPool, RenderQueueFull
+from services.template_cache import TemplateCache, scan_templates
+from services.avatar_cache import AvatarCache
+from services.image_encoding import ImageEncoding, encode_image, parse_image_encoding
 
 logger = logging.getLogger(__name__)
 
@@ -29,94 +37,330 @@ except Exception as e:
 
 #configure our background images stuff as variables
 BACKGROUND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'res', 'welcomeMessages'))
-BACKGROUND_IMAGES = ["road.jpg", "sky.jpg", "skyline.jpg"] # Image filenames within BACKGROUND_DIR
 
-async def generate_image(member_avatar_url: str, member_name: str, server_name: str) -> discord.File | None:
+# Backgrounds are decoded once, normalized to one canonical size and kept in memory. Every image in BACKGROUND_DIR is used.
+WELCOME_TEMPLATE_SIZE = tuple(int(v) for v in os.getenv('WELCOME_TEMPLATE_SIZE', '1920x1200').lower().split('x'))
+WELCOME_TEMPLATE_CACHE_MB = int(os.getenv('WELCOME_TEMPLATE_CACHE_MB', 64))
+WELCOME_TEMPLATE_CHECK_INTERVAL = float(os.getenv('WELCOME_TEMPLATE_CHECK_INTERVAL', 60))
+
+templates = TemplateCache(BACKGROUND_DIR, WELCOME_TEMPLATE_SIZE, WELCOME_TEMPLATE_CACHE_MB * 1024 * 1024)
+_template_signature: tuple = ()
+_template_checked_at = 0.0
+
+# Processed avatars are cached by avatar hash, so rejoins and repeated /test_welcome skip the download and the crop.
+AVATAR_SIZE = 300
+AVATAR_CACHE_DIR = os.getenv('AVATAR_CACHE_DIR', os.path.join('cache', 'avatars'))
+AVATAR_CACHE_MEMORY_ENTRIES = int(os.getenv('AVATAR_CACHE_MEMORY_ENTRIES', 256))
+AVATAR_CACHE_DISK_MB = int(os.getenv('AVATAR_CACHE_DISK_MB', 50))
+
+avatar_cache = AvatarCache(AVATAR_CACHE_DIR, AVATAR_CACHE_MEMORY_ENTRIES, AVATAR_CACHE_DISK_MB * 1024 * 1024)
+
+# Output encoding of welcome images. PNG at full size by default, see benchmarks/welcome_encoding.py for the tradeoffs.
+WELCOME_IMAGE_ENCODING = parse_image_encoding(
+    os.getenv('WELCOME_IMAGE_FORMAT', 'png'),
+    os.getenv('WELCOME_IMAGE_QUALITY'),
+    os.getenv('WELCOME_IMAGE_WIDTH'),
+)
+
+def _cdn_size_for(target: int) -> int:
+    # Discord only serves power of two sizes between 16 and 4096, so take the smallest one that's big enough.
+    size = 16
+    while size < target and size < 4096:
+        size *= 2
+    return size
+
+AVATAR_CDN_SIZE = _cdn_size_for(AVATAR_SIZE)
+
+# Composite images for join bursts show a row of smaller avatars.
+GROUP_AVATAR_SIZE = 180
+GROUP_AVATAR_LIMIT = 8
+
+def _init_render_worker():
+    # Runs once in every render worker, this is where the backgrounds actually get decoded.
+    templates.ensure(scan_templates(BACKGROUND_DIR))
+
+# Rendering runs in a worker pool so PIL work never blocks the event loop.
+WELCOME_RENDER_MODE = os.getenv('WELCOME_RENDER_MODE', 'process') # "process" or "thread"
+WELCOME_RENDER_WORKERS = int(os.getenv('WELCOME_RENDER_WORKERS', 2))
+WELCOME_RENDER_QUEUE_SIZE = int(os.getenv('WELCOME_RENDER_QUEUE_SIZE', 32))
+WELCOME_RENDER_BACKPRESSURE = os.getenv('WELCOME_RENDER_BACKPRESSURE', 'reject') # "reject" or "wait"
+WELCOME_RENDER_WAIT_TIMEOUT = float(os.getenv('WELCOME_RENDER_WAIT_TIMEOUT', 10))
+
+render_pool = RenderPool(
+    mode=WELCOME_RENDER_MODE,
+    workers=WELCOME_RENDER_WORKERS,
+    max_queue=WELCOME_RENDER_QUEUE_SIZE,
+    backpressure=WELCOME_RENDER_BACKPRESSURE,
+    wait_timeout=WELCOME_RENDER_WAIT_TIMEOUT,
+    initializer=_init_render_worker,
+)
+
+def get_render_stats() -> dict:
+    """Returns the welcome render pool's queue depth, counters and per-stage timings."""
+    return render_pool.stats()
+
+def shutdown_render_pool():
+    render_pool.shutdown()
+
+async def reload_templates() -> list[str]:
+    """
+    Rescans BACKGROUND_DIR. If anything changed, workers re-decode their templates before their next render.
+    Also called at startup to start the render workers, so the first join doesn't pay for decoding.
+
+    Returns:
+        list[str]: The background names now in use.
+    """
+    global _template_signature, _template_checked_at
+    signature = await asyncio.to_thread(scan_templates, BACKGROUND_DIR)
+    if signature != _template_signature:
+        logger.info(f"Welcome backgrounds changed, now using: {[name for name, _, _ in signature]}")
+    _template_signature = signature
+    _template_checked_at = time.monotonic()
+    render_pool.start()
+    return [name for name, _, _ in signature]
+
+def _load_profile(avatar_bytes: bytes, avatar_processed: bool) -> tuple[Editor, bytes | None]:
+    # Returns the circled profile image, plus its PNG encoding when it had to be made from the raw avatar.
+    if avatar_processed:
+        return Editor(avatar_bytes), None
+    profile = Editor(avatar_bytes).resize((AVATAR_SIZE, AVATAR_SIZE)).circle_image()
+    return profile, profile.image_bytes.getvalue()
+
+def render_welcome_image(avatar_bytes: bytes, avatar_processed: bool, member_name: str, server_name: str, bg_name: str, template_signature: tuple, encoding: ImageEncoding) -> tuple[tuple[bytes, bytes | None], dict]:
+    """
+    Renders a welcome image. Runs inside a render pool worker, so it only takes and returns plain data.
+
+    Args:
+        avatar_bytes (bytes): The avatar image, either as downloaded or already processed.
+        avatar_processed (bool): Whether avatar_bytes is an already resized and circled avatar from the cache.
+        member_name (str): Name of the member.
+        server_name (str): Name of the server.
+        bg_name (str): Filename of the background within BACKGROUND_DIR.
+        template_signature (tuple): The state of BACKGROUND_DIR the caller picked the background from.
+        encoding (ImageEncoding): Output format, quality and size.
+
+    Returns:
+        tuple: (encoded image, processed avatar PNG to cache or None) and the time in seconds spent on each stage.
+    """
+    timings = {}
+
+    stage_start = time.perf_counter()
+    templates.ensure(template_signature)
+    # Editor converts the shared template into its own copy, so the cached image is never drawn on.
+    background = Editor(templates.get(bg_name))
+    timings['background'] = time.perf_counter() - stage_start
+
+    # Get the profile image, then format it
+    stage_start = time.perf_counter()
+    profile, processed_avatar = _load_profile(avatar_bytes, avatar_processed)
+    timings['avatar'] = time.perf_counter() - stage_start
+
+    # Create the masterpiece which combines the profile image, server name, user name, and background image.
+    stage_start = time.perf_counter()
+    # This centers the image.
+    paste_x = (background.image.width - profile.image.width) // 2
+    paste_y = 190
+    background.paste(profile, (paste_x, paste_y)) 
+    
+    # This does the white circle outline around profile picture
+    background.ellipse((paste_x, paste_y), width=profile.image.width, height=profile.image.height, outline='white', stroke_width=5)
+    
+    # Add some text for goodness sake
+    text_y1 = 600
+    text_y2 = 750
+    background.text((background.image.width // 2, text_y1), f"Welcome to {server_name}", color='white', font=poppins_bold, align='center')
+    background.text((background.image.width // 2, text_y2), f"{member_name}", color='white', font=poppins_light, align='center')
+    timings['compose'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    image_bytes = encode_image(background.image, encoding)
+    timings['encode'] = time.perf_counter() - stage_start
+
+    return (image_bytes, processed_avatar), timings
+
+
+def render_group_welcome_image(avatars: list[tuple[bytes, bool]], server_name: str, member_count: int, bg_name: str, template_signature: tuple, encoding: ImageEncoding) -> tuple[tuple[bytes, list[bytes | None]], dict]:
+    """
+    Renders one composite welcome image for a batch of new members. Runs inside a render pool worker.
+
+    Args:
+        avatars (list[tuple[bytes, bool]]): Up to GROUP_AVATAR_LIMIT (avatar bytes, already processed) pairs.
+        server_name (str): Name of the server.
+        member_count (int): How many members joined in the batch, which can be more than the avatars shown.
+        bg_name (str): Filename of the background within BACKGROUND_DIR.
+        template_signature (tuple): The state of BACKGROUND_DIR the caller picked the background from.
+        encoding (ImageEncoding): Output format, quality and size.
+
+    Returns:
+        tuple: (encoded image, processed avatar PNGs to cache, None where already cached) and the stage timings.
+    """
+    timings = {}
+
+    stage_start = time.perf_counter()
+    templates.ensure(template_signature)
+    background = Editor(templates.get(bg_name))
+    timings['background'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    profiles = []
+    processed_avatars = []
+    for avatar_bytes, avatar_processed in avatars[:GROUP_AVATAR_LIMIT]:
+        profile, processed_avatar = _load_profile(avatar_bytes, avatar_processed)
+        profiles.append(profile.resize((GROUP_AVATAR_SIZE, GROUP_AVATAR_SIZE)))
+        processed_avatars.append(processed_avatar)
+    timings['avatar'] = time.perf_counter() - stage_start
+
+    # Lay the avatars out in a centered row, then the same text lines as the single member image.
+    stage_start = time.perf_counter()
+    gap = 20
+    row_width = len(profiles) * GROUP_AVATAR_SIZE + max(0, len(profiles) - 1) * gap
+    paste_x = (background.image.width - row_width) // 2
+    paste_y = 190 + (AVATAR_SIZE - GROUP_AVATAR_SIZE) // 2
+    for profile in profiles:
+        background.paste(profile, (paste_x, paste_y))
+        background.ellipse((paste_x, paste_y), width=GROUP_AVATAR_SIZE, height=GROUP_AVATAR_SIZE, outline='white', stroke_width=4)
+        paste_x += GROUP_AVATAR_SIZE + gap
+
+    members_text = "1 new member" if member_count == 1 else f"{member_count} new members"
+    background.text((background.image.width // 2, 600), f"Welcome to {server_name}", color='white', font=poppins_bold, align='center')
+    background.text((background.image.width // 2, 750), members_text, color='white', font=poppins_light, align='center')
+    timings['compose'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    image_bytes = encode_image(background.image, encoding)
+    timings['encode'] = time.perf_counter() - stage_start
+
+    return (image_bytes, processed_avatars), timings
+
+
+async def _get_avatar(avatar: discord.Asset | str) -> tuple[bytes | None, bool, str | None]:
+    """
+    Gets the avatar for a welcome image, from the cache if possible.
+
+    Returns:
+        tuple: (avatar bytes or None, whether the bytes are already processed, cache key or None).
+    """
+    if not isinstance(avatar, discord.Asset):
+        return await get_bytes(str(avatar)), False, None
+
+    cache_key = f"{avatar.key}_{AVATAR_SIZE}"
+    cached = await avatar_cache.get(cache_key)
+    if cached is not None:
+        return cached, True, cache_key
+
+    # Ask the CDN for the smallest variant we can use instead of the full size avatar.
+    url = avatar.with_format('png').with_size(AVATAR_CDN_SIZE).url
+    return await get_bytes(url), False, cache_key
+
+def get_avatar_cache_stats() -> dict:
+    """Returns hit/miss counters and sizes of the avatar cache."""
+    return avatar_cache.stats()
+
+async def generate_image(member_avatar: discord.Asset | str, member_name: str, server_name: str) -> discord.File | None:
     """
     Generates a welcome image with the user's avatar and server name.
 
     Args:
-        member_avatar_url (str): URL of the member's avatar.
+        member_avatar (discord.Asset | str): The member's avatar asset (cached by hash), or a plain URL (not cached).
         member_name (str): Name of the member.
         server_name (str): Name of the server.
 
     Returns:
         discord.File | None: A discord.File object containing the image bytes, 
-                             or None if an error occurred.
+                             or None if an error occurred or the render queue is full.
     """
     #Do some checks to make sure that we didn't mess up somewhere along the way
     if not FONTS_LOADED or not poppins_bold or not poppins_light:
         logger.error("Cannot generate welcome image: Fonts failed to load or are missing.")
         return None
 
-    if not BACKGROUND_IMAGES:
-        logger.error("Cannot generate welcome image: No background images configured.")
+    # Pick up added or removed backgrounds every now and then.
+    if not _template_signature or time.monotonic() - _template_checked_at > WELCOME_TEMPLATE_CHECK_INTERVAL:
+        await reload_templates()
+
+    background_names = [name for name, _, _ in _template_signature]
+    if not background_names:
+        logger.error(f"Cannot generate welcome image: No background images found in {BACKGROUND_DIR}.")
         return None
 
     #Select a background image for our beautifully made welcome image. 
-    bg_path = None
+    selected_bg_name = random.choice(background_names)
+
+    # Get the avatar here, only the bytes go to the render worker.
+    avatar_bytes, avatar_processed, cache_key = await _get_avatar(member_avatar)
+    if not avatar_bytes:
+        logger.error(f"Failed to load profile image for {member_name} from {member_avatar}")
+        return None
+
     try:
-        selected_bg_name = random.choice(BACKGROUND_IMAGES)
-        bg_path = os.path.join(BACKGROUND_DIR, selected_bg_name)
-        
-        if not os.path.exists(bg_path):
-             logger.error(f"Background image not found at path: {bg_path}")
-             return None
-        background = Editor(bg_path) 
-        logger.debug(f"Loaded background image: {bg_path}")
-
-    except FileNotFoundError:
-         logger.error(f"Background image file not found at expected path: {bg_path}")
-         return None
+        image_bytes, processed_avatar = await render_pool.submit(render_welcome_image, avatar_bytes, avatar_processed, member_name, server_name, selected_bg_name, _template_signature, WELCOME_IMAGE_ENCODING)
+    except RenderQueueFull as e:
+        logger.warning(f"Skipping welcome image for {member_name}: {e}")
+        return None
     except Exception as e:
-        # Catch other potential errors during background loading (e.g., PIL errors)
-        logger.error(f"Failed to load background image '{bg_path}': {e}", exc_info=True)
+        logger.error(f"Failed to render welcome image for {member_name} (background '{selected_bg_name}'): {e}", exc_info=True)
         return None
 
-    # Get the profile image, then format it
-    try:
-        profile_image = await load_image_async(str(member_avatar_url))
-        logger.debug(f"Loaded profile image for {member_name} from URL.")
-        
-        profile = Editor(profile_image).resize((300, 300)).circle_image()
-        logger.debug("Resized and circled profile image.")
+    if cache_key and processed_avatar:
+        await avatar_cache.put(cache_key, processed_avatar)
 
+    # Return our beautifully made welcome image
+    try:
+        output_filename = f"welcome_{member_name}.{WELCOME_IMAGE_ENCODING.extension}"
+        file = discord.File(fp=io.BytesIO(image_bytes), filename=output_filename) 
+        logger.info(f"Successfully generated welcome image '{output_filename}' for {member_name} in {server_name}.")
+        return file
     except Exception as e:
-        logger.error(f"Failed to load or process profile image for {member_name} from {member_avatar_url}: {e}", exc_info=True)
+        logger.error(f"Failed to create discord.File: {e}", exc_info=True)
         return None
 
-    # Create the masterpiece which combines the profile image, server name, user name, and background image.
-    try:
-        if not hasattr(background, 'image') or not hasattr(profile, 'image'):
-             logger.error("Internal error: Editor object missing '.image' attribute after loading.")
-             return None
-
-        # This centers the image.
-        paste_x = (background.image.width - profile.image.width) // 2
-        paste_y = 190
-        background.paste(profile, (paste_x, paste_y)) 
-        
-        # This does the white circle outline around profile picture
-        background.ellipse((paste_x, paste_y), width=profile.image.width, height=profile.image.height, outline='white', stroke_width=5)
-        
-        # Add some text for goodness sake
-        text_y1 = 600
-        text_y2 = 750
-        background.text((background.image.width // 2, text_y1), f"Welcome to {server_name}", color='white', font=poppins_bold, align='center')
-        background.text((background.image.width // 2, text_y2), f"{member_name}", color='white', font=poppins_light, align='center')
-        logger.debug("Added text elements to the image.")
 
-    except Exception as e:
-        logger.error(f"Failed during image composition (paste/text/ellipse): {e}", exc_info=True)
+async def generate_group_image(member_avatars: list[discord.Asset | str], server_name: str, member_count: int) -> discord.File | None:
+    """
+    Generates one composite welcome image for a batch of members that joined during a burst.
+
+    Args:
+        member_avatars (list[discord.Asset | str]): Avatars of the new members. Only the first GROUP_AVATAR_LIMIT are shown.
+        server_name (str): Name of the server.
+        member_count (int): How many members joined in the batch.
+
+    Returns:
+        discord.File | None: The composite image, or None if an error occurred or the render queue is full.
+    """
+    if not FONTS_LOADED or not poppins_bold or not poppins_light:
+        logger.error("Cannot generate group welcome image: Fonts failed to load or are missing.")
+        return None
+
+    if not _template_signature or time.monotonic() - _template_checked_at > WELCOME_TEMPLATE_CHECK_INTERVAL:
+        await reload_templates()
+    background_names = [name for name, _, _ in _template_signature]
+    if not background_names:
+        logger.error(f"Cannot generate group welcome image: No background images found in {BACKGROUND_DIR}.")
+        return None
+    selected_bg_name = random.choice(background_names)
+
+    fetched = await asyncio.gather(*(_get_avatar(avatar) for avatar in member_avatars[:GROUP_AVATAR_LIMIT]))
+    fetched = [(avatar_bytes, processed, cache_key) for avatar_bytes, processed, cache_key in fetched if avatar_bytes]
+    if not fetched:
+        logger.error(f"Failed to load any avatars for the group welcome image in {server_name}.")
         return None
 
-    # Return our beautifully made welcome image
     try:
-        image_bytes = background.image_bytes
-        output_filename = f"welcome_{member_name}.png"
-        file = discord.File(fp=image_bytes, filename=output_filename) 
-        logger.info(f"Successfully generated welcome image '{output_filename}' for {member_name} in {server_name}.")
-        return file
+        image_bytes, processed_avatars = await render_pool.submit(
+            render_group_welcome_image,
+            [(avatar_bytes, processed) for avatar_bytes, processed, _ in fetched],
+            server_name, member_count, selected_bg_name, _template_signature, WELCOME_IMAGE_ENCODING,
+        )
+    except RenderQueueFull as e:
+        logger.warning(f"Skipping group welcome image for {server_name}: {e}")
+        return None
     except Exception as e:
-        logger.error(f"Failed to get image bytes or create discord.File: {e}", exc_info=True)
+        logger.error(f"Failed to render group welcome image for {server_name} (background '{selected_bg_name}'): {e}", exc_info=True)
         return None
+
+    for (_, _, cache_key), processed_avatar in zip(fetched, processed_avatars):
+        if cache_key and processed_avatar:
+            await avatar_cache.put(cache_key, processed_avatar)
+
+    logger.info(f"Successfully generated group welcome image for {member_count} member(s) in {server_name}.")
+    return discord.File(fp=io.BytesIO(image_bytes), filename=f"welcome_members.{WELCOME_IMAGE_ENCODING.extension}")